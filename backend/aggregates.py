@@ -0,0 +1,104 @@
+"""
+Rollup Maintenance
+Rebuild and verify the running-total tables kept current by triggers
+
+Usage: python aggregates.py {rebuild,verify} [database]
+"""
+
+import argparse
+import os
+import sys
+
+from database import ConnectionPool
+from migrations import migrate
+
+# rollup table -> (key columns, expression for each key over transactions)
+ROLLUPS = {
+    "totals_by_type": (["type"], ["type"]),
+    "totals_by_category": (["category", "type"], ["category", "type"]),
+    "totals_by_month": (["month", "category", "type"], ["substr(date, 1, 7)", "category", "type"]),
+    "totals_by_day": (["day", "category", "type"], ["date", "category", "type"]),
+}
+
+
+def _expected_sql(key_exprs):
+    # Hot transactions plus the totals moved out to archive files
+    keys = ", ".join(key_exprs)
+    return (
+        f"SELECT {keys}, SUM(total_cents), SUM(count) FROM ("
+        "SELECT date, category, type, amount_cents AS total_cents, 1 AS count FROM transactions "
+        "UNION ALL SELECT date, category, type, total_cents, count FROM archive_totals"
+        f") GROUP BY {keys}"
+    )
+
+
+def rebuild_rollups(conn):
+    """Recompute every rollup table from the transactions table and archive totals"""
+    for table, (key_columns, key_exprs) in ROLLUPS.items():
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(
+            f"INSERT INTO {table} ({', '.join(key_columns)}, total_cents, count) "
+            + _expected_sql(key_exprs)
+        )
+
+
+def verify_rollups(conn):
+    """Compare every rollup table with a fresh aggregation
+
+    Returns a list of ``(table, key, stored, expected)`` mismatches where
+    ``stored``/``expected`` are ``(total_cents, count)`` pairs. Totals are
+    integers, so they must match exactly.
+    """
+    mismatches = []
+    for table, (key_columns, key_exprs) in ROLLUPS.items():
+        width = len(key_columns)
+        stored = {
+            row[:width]: row[width:]
+            for row in conn.execute(
+                f"SELECT {', '.join(key_columns)}, total_cents, count FROM {table} WHERE count != 0"
+            )
+        }
+        expected = {
+            row[:width]: row[width:]
+            for row in conn.execute(_expected_sql(key_exprs))
+        }
+        for key in stored.keys() | expected.keys():
+            have = stored.get(key, (0, 0))
+            want = expected.get(key, (0, 0))
+            if tuple(have) != tuple(want):
+                mismatches.append((table, key, have, want))
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild or verify budget rollup tables")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    parser.add_argument(
+        "database",
+        nargs="?",
+        default=os.environ.get("BUDGET_TRACKER_DB", "budget_tracker.db"),
+    )
+    args = parser.parse_args(argv)
+    
+    pool = ConnectionPool(args.database)
+    try:
+        migrate(pool)
+        with pool.writer() as conn:
+            if args.command == "rebuild":
+                rebuild_rollups(conn)
+                print("Rollup tables rebuilt")
+                return 0
+            
+            mismatches = verify_rollups(conn)
+    finally:
+        pool.close()
+    
+    for table, key, have, want in mismatches:
+        print(f"{table} {key}: stored total_cents={have[0]} count={have[1]}, "
+              f"expected total_cents={want[0]} count={want[1]}")
+    print(f"{len(mismatches)} mismatched rollup rows")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+Columnar Analytics
+Every transaction of a shard, hot and archived, held as NumPy column
+arrays for vectorized aggregation under arbitrary filters
+
+Optional: without NumPy (or with BUDGET_ANALYTICS_ENGINE=0) aggregations
+run in SQL instead. Columns are the id, the date as days since 1970-01-01,
+the category as an index into a dictionary of names, the type code and the
+amount in int64 cents. Deleted rows are tombstoned, not removed.
+
+The store catches up before each query once data_version has moved: rows
+with ids above the highest loaded id are appended, and the per-type counts
+and totals are compared with the totals_by_type rollup. Any difference left
+(a delete by another process, an edited row) triggers a full reload.
+"""
+
+import os
+import threading
+from collections import deque
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:  # optional: aggregate in SQL instead
+    np = None
+
+from archive import ALIAS, archived_years, attached
+
+ENABLED = np is not None and os.environ.get("BUDGET_ANALYTICS_ENGINE", "1") == "1"
+
+GROUPINGS = ("category", "type", "day", "week", "month")
+PERIODS = ("day", "week", "month")
+TYPES = ("income", "expense")
+
+NO_DATE = -(2 ** 31)  # date column value for dates that are not YYYY-MM-DD
+EPOCH = date(1970, 1, 1).toordinal()
+LOAD_COLUMNS = "id, date, category, type, amount_cents"
+LOAD_CHUNK_ROWS = 20000  # rows held as Python tuples at once while loading
+COLUMNS = ("ids", "days", "categories", "types", "cents", "alive")
+
+# SQL fallback: grouping key over a transactions row
+SQL_KEYS = {
+    "category": "category",
+    "type": "type",
+    "day": "date",
+    "week": "date(date, '-6 days', 'weekday 1')",
+    "month": "substr(date, 1, 7)",
+}
+VALID_DATE = "date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+
+
+def _day(value):
+    return date.fromisoformat(value).toordinal() - EPOCH
+
+
+def _parse_days(dates):
+    try:
+        return np.array(dates, dtype="datetime64[D]").astype(np.int64)
+    except ValueError:  # at least one malformed date; parse row by row
+        days = []
+        for value in dates:
+            try:
+                days.append(_day(value))
+            except (TypeError, ValueError):
+                days.append(NO_DATE)
+        return np.array(days, dtype=np.int64)
+
+
+def _chunks(conn, schema, where="", params=()):
+    cursor = conn.execute(f"SELECT {LOAD_COLUMNS} FROM {schema}.transactions{where}", params)
+    try:
+        while True:
+            rows = cursor.fetchmany(LOAD_CHUNK_ROWS)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.close()  # an unfinished statement would keep an archive attached
+
+
+class ColumnStore:
+    """Column arrays for one shard, refreshed lazily from its database
+
+    ``aggregate`` is meant to run on the database executor through
+    ``AsyncDatabase.read``; ``discard`` may be called from anywhere.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._discarded = deque()
+        self.version = None
+        self.loads = 0
+        self._clear()
+
+    def _clear(self):
+        self.size = 0
+        self.max_id = 0
+        self.ids = np.empty(0, dtype=np.int64)
+        self.days = np.empty(0, dtype=np.int32)
+        self.categories = np.empty(0, dtype=np.int32)
+        self.types = np.empty(0, dtype=np.int8)
+        self.cents = np.empty(0, dtype=np.int64)
+        self.alive = np.empty(0, dtype=bool)
+        self.names = []
+        self._codes = {}
+        self.type_counts = [0, 0]
+        self.type_cents = [0, 0]
+
+    def _reserve(self, size):
+        capacity = len(self.ids)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2, 1024)
+        for column in COLUMNS:
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, column, new)
+
+    def _code(self, name):
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def _write(self, rows):
+        """Encode (id, date, category, type, amount_cents) rows onto the end, unsorted"""
+        ids, dates, categories, types, cents = zip(*rows)
+        start, end = self.size, self.size + len(rows)
+        self._reserve(end)
+        self.ids[start:end] = ids
+        self.days[start:end] = _parse_days(dates)
+        self.categories[start:end] = np.fromiter(map(self._code, categories), dtype=np.int32, count=len(rows))
+        self.types[start:end] = np.fromiter((value == "expense" for value in types), dtype=np.int8, count=len(rows))
+        self.cents[start:end] = cents
+        self.alive[start:end] = True
+        self.size = end
+
+    def _settle(self, start):
+        """Sort the rows written since ``start`` by id and count them in"""
+        if start == self.size:
+            return
+        ids = self.ids[start:self.size]
+        order = np.argsort(ids, kind="stable")
+        # A half-archived batch can appear twice; keep one copy of each id
+        order = order[np.concatenate(([True], np.diff(ids[order]) != 0))]
+        for column in COLUMNS:
+            values = getattr(self, column)
+            values[start:start + len(order)] = values[start:self.size][order]
+        self.size = start + len(order)
+        self.max_id = int(self.ids[self.size - 1])
+        for code in (0, 1):
+            selected = self.types[start:self.size] == code
+            self.type_counts[code] += int(selected.sum())
+            self.type_cents[code] += int(self.cents[start:self.size][selected].sum())
+
+    def _tombstone(self, transaction_id):
+        index = int(np.searchsorted(self.ids[:self.size], transaction_id))
+        if index < self.size and self.ids[index] == transaction_id and self.alive[index]:
+            self.alive[index] = False
+            code = self.types[index]
+            self.type_counts[code] -= 1
+            self.type_cents[code] -= int(self.cents[index])
+
+    def _load(self, conn):
+        # Chunks go straight into arrays sized from the rollup (which also
+        # counts archived rows), so the rows never exist as tuples all at once
+        self._clear()
+        self._reserve(conn.execute("SELECT COALESCE(SUM(count), 0) FROM totals_by_type").fetchone()[0])
+        for rows in _chunks(conn, "main"):
+            self._write(rows)
+        for _, filename in archived_years(conn):
+            with attached(conn, filename):
+                for rows in _chunks(conn, ALIAS):
+                    self._write(rows)
+        self._settle(0)
+        self.loads += 1
+
+    def _in_sync(self, conn):
+        rollup = {row[0]: (row[1], row[2]) for row in conn.execute(
+            "SELECT type, count, total_cents FROM totals_by_type"
+        )}
+        return all(
+            rollup.get(name, (0, 0)) == (self.type_counts[code], self.type_cents[code])
+            for code, name in enumerate(TYPES)
+        )
+
+    def refresh(self, conn):
+        """Bring the arrays up to date with the database"""
+        version = conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()[0]
+        while self._discarded:
+            self._tombstone(self._discarded.popleft())
+        if version == self.version:
+            return
+        if self.version is not None:
+            # New rows always land in the hot database with higher ids
+            start = self.size
+            for rows in _chunks(conn, "main", " WHERE id > ?", (self.max_id,)):
+                self._write(rows)
+            self._settle(start)
+        if self.version is None or not self._in_sync(conn):
+            self._load(conn)
+        self.version = version
+
+    def discard(self, transaction_id):
+        """Tombstone a deleted transaction before the next query"""
+        self._discarded.append(transaction_id)
+
+    def aggregate(self, conn, group_by, type=None, category=None, date_from=None, date_to=None,
+                  min_cents=None, max_cents=None):
+        """``[(key, total_cents, count)]`` of matching rows grouped by ``group_by``, by key"""
+        with self._lock:
+            self.refresh(conn)
+            size = self.size
+            mask = self.alive[:size].copy()
+            days = self.days[:size]
+            if type is not None:
+                mask &= self.types[:size] == (TYPES.index(type) if type in TYPES else -1)
+            if category is not None:
+                mask &= self.categories[:size] == self._codes.get(category, -1)
+            if date_from or date_to or group_by in PERIODS:
+                mask &= days != NO_DATE
+            if date_from:
+                mask &= days >= _day(date_from)
+            if date_to:
+                mask &= days <= _day(date_to)
+            if min_cents is not None:
+                mask &= self.cents[:size] >= min_cents
+            if max_cents is not None:
+                mask &= self.cents[:size] <= max_cents
+
+            cents = self.cents[:size][mask]
+            if group_by == "category":
+                keys, labels = self.categories[:size][mask], list(self.names)
+            elif group_by == "type":
+                keys, labels = self.types[:size][mask], list(TYPES)
+            else:
+                keys, labels = self._period_keys(group_by, days[mask])
+
+        # Integer cents stay exact in the float64 weights below 2**53
+        counts = np.bincount(keys, minlength=len(labels))
+        totals = np.bincount(keys, weights=cents, minlength=len(labels))
+        return sorted(
+            (labels[key], int(totals[key]), int(counts[key]))
+            for key in np.flatnonzero(counts)
+        )
+
+    @staticmethod
+    def _period_keys(group_by, days):
+        # Offsets from the earliest bucket plus a label for every offset
+        if not len(days):
+            return days.astype(np.intp), []
+        days = days.astype(np.int64)
+        if group_by == "month":
+            buckets = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+            unit, step = "M", 1
+        elif group_by == "week":
+            buckets = days - (days + 3) % 7  # 1970-01-01 was a Thursday
+            unit, step = "D", 7
+        else:
+            buckets, unit, step = days, "D", 1
+        first = int(buckets.min())
+        offsets = (buckets - first) // step
+        starts = np.arange(first, first + (int(offsets.max()) + 1) * step, step)
+        return offsets, starts.astype(f"datetime64[{unit}]").astype(str).tolist()
+
+    def snapshot(self):
+        """Size counters as a plain dict"""
+        return {
+            "rows": self.size,
+            "deleted": int(self.size - self.alive[:self.size].sum()),
+            "categories": len(self.names),
+            "loads": self.loads,
+        }
+
+
+def sql_aggregate(conn, group_by, where, params, date_from=None, date_to=None):
+    """The same grouping as ``ColumnStore.aggregate`` over hot and archived rows in SQL
+
+    ``where``/``params`` come from ``transaction_filters``.
+    """
+    key = SQL_KEYS[group_by]
+    if date_from or date_to or group_by in PERIODS:
+        where += (" AND " if where else " WHERE ") + VALID_DATE
+    query = "SELECT {key}, SUM(amount_cents), COUNT(*) FROM {schema}.transactions{where} GROUP BY 1"
+
+    groups = {}
+    def add(rows):
+        for name, total, count in rows:
+            have = groups.get(name, (0, 0))
+            groups[name] = (have[0] + total, have[1] + count)
+
+    add(conn.execute(query.format(key=key, schema="main", where=where), params))
+    # Rows of a half-archived batch are counted once, from the hot database
+    archive_where = where + (" AND " if where else " WHERE ") + "id NOT IN (SELECT id FROM main.transactions)"
+    for _, filename in archived_years(conn, date_from, date_to):
+        with attached(conn, filename):
+            add(conn.execute(query.format(key=key, schema=ALIAS, where=archive_where), params).fetchall())
+    return [(name, total, count) for name, (total, count) in sorted(groups.items())]
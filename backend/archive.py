@@ -0,0 +1,326 @@
+"""
+Transaction Archive
+Moves transactions older than a horizon out of the hot database into one
+SQLite file per year, attached on demand when a query reaches back that far
+
+The hot database keeps a manifest of archive files (``archives``) and the
+per-day totals they hold (``archive_totals``). Archived amounts stay in the
+rollup tables, so summaries, category spending and trends never open an
+archive. Listings, exports and lookups by id that reach into archived
+years attach the matching files one at a time. Archived rows are read-only,
+are not covered by full-text search and do not show up as deletes in the
+delta-sync change log.
+
+Rows move in batches, each copied into the archive in one transaction and
+removed from the hot database in the next. A crash in between leaves the
+batch in both files; readers drop the duplicates and the next run finishes
+the move.
+
+Usage: python archive.py {run,status} [database ...]
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sys
+from contextlib import closing, contextmanager, nullcontext
+from datetime import date, timedelta
+
+from aggregates import ROLLUPS
+from database import ConnectionPool
+from migrations import migrate
+from pagination import ORDER_BY, TRANSACTION_COLUMNS
+
+# Archiving policy (overridable through the environment)
+ARCHIVE_AFTER_DAYS = int(os.environ.get("BUDGET_ARCHIVE_AFTER_DAYS", "730"))
+ARCHIVE_BATCH_ROWS = int(os.environ.get("BUDGET_ARCHIVE_BATCH_ROWS", "5000"))
+
+ALIAS = "archive"
+STORED_COLUMNS = "id, title, amount_cents, category, type, date, time, description, created_at"
+BATCH = "id IN (SELECT value FROM json_each(?))"
+
+# Per-day totals of everything archived, keyed like the rollups
+ARCHIVE_TOTALS = ("archive_totals", (["date", "category", "type"], ["date", "category", "type"]))
+
+
+def archive_filename(database_path, year):
+    """File name of the archive for ``year``, stored next to the hot database"""
+    base = os.path.splitext(os.path.basename(database_path))[0]
+    return f"{base}.archive-{year:04d}.db"
+
+
+def cutoff_date(after_days=ARCHIVE_AFTER_DAYS, today=None):
+    """Transactions dated before this day are due for archiving"""
+    return ((today or date.today()) - timedelta(days=after_days)).isoformat()
+
+
+def _archive_path(conn, filename):
+    main = next(row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main")
+    return os.path.join(os.path.dirname(main), filename)
+
+
+@contextmanager
+def attached(conn, filename):
+    """Attach an archive file as ``archive`` for the duration of the block"""
+    path = _archive_path(conn, filename)
+    if not os.path.exists(path):  # ATTACH would silently create an empty file
+        raise FileNotFoundError(f"Archive file is missing: {path}")
+    conn.execute(f"ATTACH DATABASE ? AS {ALIAS}", (path,))
+    try:
+        yield conn
+    finally:
+        conn.execute(f"DETACH DATABASE {ALIAS}")
+
+
+# Read side (reader connections)
+
+def archived_years(conn, date_from=None, date_to=None):
+    """``(year, filename)`` of archives overlapping the date range, newest first"""
+    clauses = []
+    params = []
+    if date_from:
+        clauses.append("last_date >= ?")
+        params.append(date_from)
+    if date_to:
+        clauses.append("first_date <= ?")
+        params.append(date_to)
+    where = (" AND " + " AND ".join(clauses)) if clauses else ""
+    return conn.execute(
+        f"SELECT year, filename FROM archives WHERE row_count > 0{where} ORDER BY year DESC", params
+    ).fetchall()
+
+
+def _bounded(where, low, high):
+    clauses = []
+    params = []
+    if low is not None:
+        clauses.append("date >= ?")
+        params.append(low)
+    if high is not None:
+        clauses.append("date < ?")
+        params.append(high)
+    if not clauses:
+        return where, params
+    return where + (" AND " if where else " WHERE ") + " AND ".join(clauses), params
+
+
+def _segments(archives):
+    # Split the date range into slices that are either hot-only or one
+    # archive year plus the hot rows dated in that year, newest first
+    upper = None
+    for year, filename in archives:
+        start, end = f"{year:04d}-01-01", f"{year + 1:04d}-01-01"
+        if upper != end:
+            yield end, upper, None
+        yield start, end, filename
+        upper = start
+    yield None, upper, None
+
+
+def _sort_key(row):
+    # (date, time, id) of a TRANSACTION_COLUMNS row, matching ORDER_BY
+    return row[5], row[6], row[0]
+
+
+def iter_transactions(conn, where, params, archives):
+    """Yield matching TRANSACTION_COLUMNS rows from hot and archived data in ORDER_BY order
+
+    ``where``/``params`` come from ``transaction_filters``. Only one archive
+    is attached at a time; close the generator to release it early.
+    """
+    last_id = None
+    for low, high, filename in _segments(archives):
+        hot_where, bounds = _bounded(where, low, high)
+        with attached(conn, filename) if filename else nullcontext():
+            cursors = []
+            try:
+                cursors.append(conn.execute(
+                    f"SELECT {TRANSACTION_COLUMNS} FROM main.transactions{hot_where} {ORDER_BY}",
+                    [*params, *bounds]
+                ))
+                if filename:
+                    cursors.append(conn.execute(
+                        f"SELECT {TRANSACTION_COLUMNS} FROM {ALIAS}.transactions{where} {ORDER_BY}", params
+                    ))
+                for row in heapq.merge(*cursors, key=_sort_key, reverse=True):
+                    if row[0] != last_id:  # a half-moved batch is in both files
+                        last_id = row[0]
+                        yield row
+            finally:
+                # Unfinished statements would keep the archive from detaching
+                for cursor in cursors:
+                    cursor.close()
+
+
+def find_transaction(conn, transaction_id):
+    """The archived TRANSACTION_COLUMNS row with this id, or None"""
+    archives = conn.execute(
+        "SELECT filename FROM archives WHERE ? BETWEEN min_id AND max_id ORDER BY year DESC",
+        (transaction_id,)
+    ).fetchall()
+    for (filename,) in archives:
+        with attached(conn, filename):
+            row = conn.execute(
+                f"SELECT {TRANSACTION_COLUMNS} FROM {ALIAS}.transactions WHERE id = ?", (transaction_id,)
+            ).fetchone()
+        if row:
+            return row
+    return None
+
+
+def archive_status(conn):
+    """Manifest rows as plain dicts, oldest year first"""
+    cursor = conn.execute(
+        "SELECT year, filename, row_count, min_id, max_id, first_date, last_date, archived_at "
+        "FROM archives ORDER BY year"
+    )
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+# Write side
+
+def _create_archive(conn):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {ALIAS}.transactions (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            amount_cents INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL,
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP
+        )
+    ''')
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {ALIAS}.idx_transactions_date_time ON transactions (date, time)")
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {ALIAS}.idx_transactions_type_date_time ON transactions (type, date, time)"
+    )
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {ALIAS}.idx_transactions_category_date_time "
+        "ON transactions (category, date, time)"
+    )
+
+
+def _next_batch(conn, start, end, batch_rows):
+    return [row[0] for row in conn.execute(
+        "SELECT id FROM transactions WHERE date >= ? AND date < ? ORDER BY id LIMIT ?",
+        (start, end, batch_rows)
+    )]
+
+
+def _copy_batch(conn, ids):
+    _create_archive(conn)
+    conn.execute(
+        f"INSERT OR REPLACE INTO {ALIAS}.transactions ({STORED_COLUMNS}) "
+        f"SELECT {STORED_COLUMNS} FROM main.transactions WHERE {BATCH}",
+        (ids,)
+    )
+
+
+def _remove_batch(conn, year, filename, ids):
+    # Add the batch back onto the rollups before the delete triggers take it
+    # off, so they keep covering archived history
+    for table, (key_columns, key_exprs) in [*ROLLUPS.items(), ARCHIVE_TOTALS]:
+        columns = ", ".join(key_columns)
+        exprs = ", ".join(key_exprs)
+        conn.execute(f'''
+            INSERT INTO {table} ({columns}, total_cents, count)
+            SELECT {exprs}, SUM(amount_cents), COUNT(*) FROM transactions WHERE {BATCH} GROUP BY {exprs}
+            ON CONFLICT ({columns}) DO UPDATE SET
+                total_cents = total_cents + excluded.total_cents, count = count + excluded.count
+        ''', (ids,))
+    conn.execute(f'''
+        INSERT INTO archives (year, filename, row_count, min_id, max_id, first_date, last_date)
+        SELECT ?, ?, COUNT(*), MIN(id), MAX(id), MIN(date), MAX(date) FROM transactions WHERE {BATCH}
+        ON CONFLICT (year) DO UPDATE SET
+            row_count = row_count + excluded.row_count,
+            min_id = MIN(min_id, excluded.min_id),
+            max_id = MAX(max_id, excluded.max_id),
+            first_date = MIN(first_date, excluded.first_date),
+            last_date = MAX(last_date, excluded.last_date),
+            archived_at = CURRENT_TIMESTAMP
+    ''', (year, filename, ids))
+    # The rows still exist, so drop the deletes the change log records for them
+    logged = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+    removed = conn.execute(f"DELETE FROM transactions WHERE {BATCH}", (ids,)).rowcount
+    conn.execute("DELETE FROM change_log WHERE seq > ? AND op = 'delete'", (logged,))
+    return removed
+
+
+def archive_transactions(pool, before, batch_rows=ARCHIVE_BATCH_ROWS):
+    """Move every transaction dated before ``before`` into its year's archive
+
+    Returns ``{year: rows moved}``. Rows with dates that do not start with a
+    four-digit year stay in the hot database.
+    """
+    with pool.reader() as conn:
+        years = [int(row[0]) for row in conn.execute(
+            "SELECT DISTINCT substr(date, 1, 4) FROM transactions "
+            "WHERE date < ? AND date GLOB '[0-9][0-9][0-9][0-9]-*'",
+            (before,)
+        )]
+
+    moved = {}
+    for year in years:
+        filename = archive_filename(pool.database_path, year)
+        path = os.path.join(os.path.dirname(pool.database_path), filename)
+        start, end = f"{year:04d}-01-01", min(f"{year + 1:04d}-01-01", before)
+        while True:
+            with pool.writer(attach={ALIAS: path}) as conn:
+                ids = _next_batch(conn, start, end, batch_rows)
+                if ids:
+                    _copy_batch(conn, json.dumps(ids))
+            if not ids:
+                break
+            with pool.writer() as conn:
+                moved[year] = moved.get(year, 0) + _remove_batch(conn, year, filename, json.dumps(ids))
+    return moved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old transactions into per-year databases")
+    parser.add_argument("command", choices=["run", "status"])
+    parser.add_argument(
+        "databases",
+        nargs="*",
+        metavar="database",
+        default=[os.environ.get("BUDGET_TRACKER_DB", "budget_tracker.db")],
+    )
+    parser.add_argument("--after-days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="archive transactions older than this many days")
+    parser.add_argument("--before", help="archive transactions dated before this day (YYYY-MM-DD)")
+    parser.add_argument("--batch-rows", type=int, default=ARCHIVE_BATCH_ROWS)
+    parser.add_argument("--vacuum", action="store_true", help="reclaim the freed space afterwards")
+    args = parser.parse_args(argv)
+
+    before = args.before or cutoff_date(args.after_days)
+    for database in args.databases:
+        pool = ConnectionPool(database)
+        try:
+            migrate(pool)
+            if args.command == "status":
+                with pool.reader() as conn:
+                    for entry in archive_status(conn):
+                        print(f"{database} {entry['year']}: {entry['row_count']} rows "
+                              f"({entry['first_date']} .. {entry['last_date']}) in {entry['filename']}")
+                continue
+
+            moved = archive_transactions(pool, before, max(1, args.batch_rows))
+            for year, rows in sorted(moved.items()):
+                print(f"{database}: archived {rows} transactions from {year}")
+            if not moved:
+                print(f"{database}: nothing dated before {before}")
+            elif args.vacuum:
+                with closing(pool.connect()) as conn:
+                    conn.execute("VACUUM")
+        finally:
+            pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
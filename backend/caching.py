@@ -0,0 +1,40 @@
+"""
+Conditional GET Support
+ETag / If-None-Match handling driven by the database data version counter
+"""
+
+from fastapi import Response
+
+from shards import USER_HEADER
+
+# Clients may store responses but must revalidate them on every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(version, shard=None):
+    """ETag for a response produced at the given data version of a shard"""
+    if shard is None:
+        return f'"v{version}"'
+    return f'"{shard}-v{version}"'
+
+
+def etag_matches(request, etag):
+    """True when the request's If-None-Match already names ``etag``"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def cache_headers(etag):
+    """Validator headers attached to cacheable responses"""
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": USER_HEADER}
+
+
+def not_modified(etag):
+    """Empty 304 response for a matching conditional request"""
+    return Response(status_code=304, headers=cache_headers(etag))
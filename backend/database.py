@@ -0,0 +1,444 @@
+"""
+Database Access Layer
+Long-lived SQLite connections shared by all API endpoints, driven from a
+bounded thread pool so async handlers never block the event loop
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import partial
+from itertools import islice
+
+# Pool configuration (overridable through the environment)
+POOL_SIZE = int(os.environ.get("BUDGET_DB_POOL_SIZE", "8"))
+MMAP_SIZE = int(os.environ.get("BUDGET_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+CACHE_SIZE_KB = int(os.environ.get("BUDGET_DB_CACHE_SIZE_KB", str(64 * 1024)))
+BUSY_TIMEOUT = float(os.environ.get("BUDGET_DB_BUSY_TIMEOUT", "5.0"))
+MAX_WORKERS = int(os.environ.get("BUDGET_DB_MAX_WORKERS", str(POOL_SIZE)))
+STREAM_CHUNK_SIZE = int(os.environ.get("BUDGET_DB_STREAM_CHUNK_SIZE", "1000"))
+# Serialise writers across processes (set by multi-worker production mode)
+PROCESS_LOCK = os.environ.get("BUDGET_DB_PROCESS_LOCK", "0") == "1"
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class ProcessLock:
+    """Blocking exclusive lock on a sidecar file, shared by every process
+
+    Writers from several uvicorn workers queue on this lock in order instead
+    of spinning in SQLite's busy handler and failing with "database is
+    locked" once the busy timeout runs out.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        if self._file is None:
+            self._file = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            return
+        self._file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue  # LK_LOCK gives up after ~10 s; keep waiting
+
+    def release(self):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports statement and fetch timings to query observers
+
+    Observers are objects with ``on_execute(cursor, sql, params, seconds)``
+    and ``on_fetch(cursor, sql, rows, seconds)`` methods, registered on the
+    pool. ``params`` is None for ``executemany``. ``cursor.seconds`` is the
+    current statement's execute time plus its fetch time so far.
+    """
+
+    def execute(self, sql, parameters=()):
+        observers = self.connection.observers
+        if not observers:
+            return super().execute(sql, parameters)
+        self.sql = sql
+        self.params = parameters
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        elapsed = self.seconds = time.perf_counter() - started
+        for observer in observers:
+            observer.on_execute(self, sql, parameters, elapsed)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        observers = self.connection.observers
+        if not observers:
+            return super().executemany(sql, seq_of_parameters)
+        self.sql = sql
+        self.params = None
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        elapsed = self.seconds = time.perf_counter() - started
+        for observer in observers:
+            observer.on_execute(self, sql, None, elapsed)
+        return self
+
+    def fetchone(self):
+        return self._observe_fetch(super().fetchone, single=True)
+
+    def fetchmany(self, size=None):
+        return self._observe_fetch(partial(super().fetchmany, size or self.arraysize))
+
+    def fetchall(self):
+        return self._observe_fetch(super().fetchall)
+
+    def _observe_fetch(self, fetch, single=False):
+        observers = self.connection.observers
+        if not observers:
+            return fetch()
+        started = time.perf_counter()
+        result = fetch()
+        elapsed = time.perf_counter() - started
+        rows = (result is not None) if single else len(result)
+        sql = getattr(self, "sql", "")
+        self.seconds = getattr(self, "seconds", 0.0) + elapsed
+        for observer in observers:
+            observer.on_fetch(self, sql, rows, elapsed)
+        return result
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors (including ``execute`` shortcuts) are instrumented"""
+
+    observers = ()
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionPool:
+    """Per-thread reader connections plus one dedicated writer connection
+
+    Readers run in autocommit mode with ``query_only`` set, so they never hold
+    a snapshot open between requests. All writes are serialised through the
+    single writer, which wraps each unit of work in ``BEGIN IMMEDIATE`` so
+    WAL readers are never blocked and writers never deadlock on upgrade.
+    """
+
+    def __init__(self, database_path, size=POOL_SIZE, mmap_size=MMAP_SIZE,
+                 cache_size_kb=CACHE_SIZE_KB, process_lock=PROCESS_LOCK):
+        self.database_path = database_path
+        self.size = size
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.observers = []
+        self.process_lock = ProcessLock(f"{database_path}.writer-lock") if process_lock else None
+
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._reader_slots = threading.BoundedSemaphore(size)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    def connect(self, query_only=False):
+        """Open a new connection configured for this pool"""
+        conn = sqlite3.connect(
+            self.database_path,
+            timeout=BUSY_TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False,
+            factory=InstrumentedConnection,
+        )
+        conn.observers = self.observers
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        if query_only:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def add_observer(self, observer):
+        """Register a query observer on every current and future connection"""
+        self.observers.append(observer)
+
+    @contextmanager
+    def reader(self):
+        """Borrow the calling thread's reader connection"""
+        with self._reader_slots:
+            conn = getattr(self._local, "reader", None)
+            if conn is None:
+                conn = self.connect(query_only=True)
+                self._local.reader = conn
+                with self._readers_lock:
+                    self._readers.append(conn)
+            yield conn
+
+    @contextmanager
+    def writer(self, attach=None):
+        """Run a unit of work on the writer connection inside one transaction
+
+        ``attach`` maps schema names to extra database files that are
+        attached for this transaction only (ATTACH is not allowed inside one).
+        """
+        attached = []
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = self.connect()
+            conn = self._writer
+            if self.process_lock:
+                self.process_lock.acquire()
+            try:
+                for name, path in (attach or {}).items():
+                    conn.execute(f"ATTACH DATABASE ? AS {name}", (path,))
+                    attached.append(name)
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    yield conn
+                    conn.execute("COMMIT")
+                except BaseException:
+                    # A failed COMMIT may leave the transaction open; SQLite may
+                    # also have rolled it back already (ROLLBACK would then fail)
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    raise
+            finally:
+                for name in attached:
+                    conn.execute(f"DETACH DATABASE {name}")
+                if self.process_lock:
+                    self.process_lock.release()
+
+    def close(self):
+        """Close every connection owned by the pool"""
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for conn in readers:
+            conn.close()
+        self._local = threading.local()
+
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            if self.process_lock:
+                self.process_lock.close()
+
+
+class ExecutorStats:
+    """Queue-time and concurrency counters for the database executor"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.running = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+        self.run_time_total = 0.0
+
+    def on_submit(self):
+        with self._lock:
+            self.submitted += 1
+
+    def on_start(self, queue_time):
+        with self._lock:
+            self.running += 1
+            self.queue_time_total += queue_time
+            if queue_time > self.queue_time_max:
+                self.queue_time_max = queue_time
+
+    def on_finish(self, run_time, failed):
+        with self._lock:
+            self.running -= 1
+            self.completed += 1
+            self.run_time_total += run_time
+            if failed:
+                self.failed += 1
+
+    def snapshot(self):
+        """Return the current counters as a plain dict"""
+        with self._lock:
+            started = self.completed + self.running
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "running": self.running,
+                "queued": self.submitted - started,
+                "queue_time_avg_ms": (self.queue_time_total / started * 1000) if started else 0.0,
+                "queue_time_max_ms": self.queue_time_max * 1000,
+                "run_time_avg_ms": (self.run_time_total / self.completed * 1000) if self.completed else 0.0,
+            }
+
+
+class AsyncDatabase:
+    """Async facade over a ConnectionPool
+
+    Every call is shipped to a bounded ``ThreadPoolExecutor`` whose size caps
+    how many statements run concurrently; pass ``executor`` and ``stats`` to
+    share one executor between several databases. Callables receive the
+    borrowed connection as their first argument; write callables run inside
+    a single transaction on the writer connection.
+    """
+
+    def __init__(self, pool, max_workers=MAX_WORKERS, executor=None, stats=None):
+        self.pool = pool
+        self.max_workers = max_workers
+        self.stats = stats or ExecutorStats()
+        # Several databases may share one executor; only an owned one is shut down
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+
+    async def read(self, fn, *args):
+        """Run ``fn(conn, *args)`` on a reader connection"""
+        return await self._submit(self.pool.reader, fn, args)
+
+    async def write(self, fn, *args):
+        """Run ``fn(conn, *args)`` in a write transaction"""
+        return await self._submit(self.pool.writer, fn, args)
+
+    async def fetchall(self, sql, params=()):
+        """Execute a read query and return every row"""
+        return await self.read(_fetchall, sql, params)
+
+    async def fetchall_dicts(self, sql, params=()):
+        """Execute a read query and return every row as a column-keyed dict"""
+        return await self.read(_fetchall_dicts, sql, params)
+
+    async def fetchone(self, sql, params=()):
+        """Execute a read query and return the first row"""
+        return await self.read(_fetchone, sql, params)
+
+    async def stream(self, sql, params=(), chunk_size=STREAM_CHUNK_SIZE):
+        """Yield the rows of a read query in chunks of ``chunk_size``
+
+        The query runs on a dedicated read-only connection held for the
+        lifetime of the iteration, so long exports never pin a pooled reader.
+        Each chunk is fetched on the executor, keeping memory flat.
+        """
+        loop = asyncio.get_running_loop()
+        conn = await loop.run_in_executor(self._executor, partial(self.pool.connect, query_only=True))
+        borrow = partial(nullcontext, conn)
+        try:
+            cursor = await self._submit(borrow, _execute, (sql, params))
+            while True:
+                rows = await self._submit(borrow, _fetchmany, (cursor, chunk_size))
+                if not rows:
+                    break
+                yield rows
+        finally:
+            self._executor.submit(conn.close)
+
+    async def stream_rows(self, fn, *args, chunk_size=STREAM_CHUNK_SIZE):
+        """Yield the rows of the iterator ``fn(conn, *args)`` in chunks of ``chunk_size``
+
+        Like ``stream`` but for row generators that issue their own queries.
+        The iterator is closed on the executor before its connection.
+        """
+        loop = asyncio.get_running_loop()
+        conn = await loop.run_in_executor(self._executor, partial(self.pool.connect, query_only=True))
+        borrow = partial(nullcontext, conn)
+        rows = iter(())
+        try:
+            rows = await self._submit(borrow, _iterate, (fn, args))
+            while True:
+                chunk = await self._submit(borrow, _take, (rows, chunk_size))
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            self._executor.submit(_close_iterator, conn, rows)
+
+    async def _submit(self, borrow, fn, args):
+        self.stats.on_submit()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._run, borrow, fn, args, time.perf_counter()
+        )
+
+    def _run(self, borrow, fn, args, submitted_at):
+        started_at = time.perf_counter()
+        self.stats.on_start(started_at - submitted_at)
+        failed = True
+        try:
+            with borrow() as conn:
+                result = fn(conn, *args)
+            failed = False
+            return result
+        finally:
+            self.stats.on_finish(time.perf_counter() - started_at, failed)
+
+    def close(self):
+        """Drain the executor (when owned) and close the underlying pool"""
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+        self.pool.close()
+
+
+def _execute(conn, sql, params):
+    return conn.execute(sql, params)
+
+
+def _iterate(conn, fn, args):
+    return iter(fn(conn, *args))
+
+
+def _take(conn, rows, size):
+    return list(islice(rows, size))
+
+
+def _close_iterator(conn, rows):
+    try:
+        if hasattr(rows, "close"):
+            rows.close()
+    finally:
+        conn.close()
+
+
+def _fetchmany(conn, cursor, size):
+    return cursor.fetchmany(size)
+
+
+def _fetchall(conn, sql, params):
+    return conn.execute(sql, params).fetchall()
+
+
+def _fetchall_dicts(conn, sql, params):
+    cursor = conn.execute(sql, params)
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _fetchone(conn, sql, params):
+    return conn.execute(sql, params).fetchone()
@@ -0,0 +1,164 @@
+"""
+Spend Forecasting
+Month-end spend projections per expense category from the daily rollup
+
+The rest of the month is projected two ways and blended: a moving average
+of the last LOOKBACK_DAYS days, and a seasonal baseline averaging what was
+spent after the same day of the month in the previous SEASONAL_MONTHS
+months. The seasonal share grows with the months of history available, so
+a rent paid on the 1st stops being spread over the month once a few months
+are known. Each category's projection is cached per shard and recomputed only
+when that category's rollup (count, total) or budget changes, the first day
+of expense history moves, or the day rolls over.
+"""
+
+import calendar
+import os
+import threading
+from datetime import date, timedelta
+
+# Model configuration (overridable through the environment)
+LOOKBACK_DAYS = int(os.environ.get("BUDGET_FORECAST_LOOKBACK_DAYS", "28"))
+SEASONAL_MONTHS = max(1, int(os.environ.get("BUDGET_FORECAST_SEASONAL_MONTHS", "6")))
+
+
+def _shift_month(month_start, months):
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _month_end(month_start):
+    return month_start.replace(day=calendar.monthrange(month_start.year, month_start.month)[1])
+
+
+def _total(daily, start, end):
+    # Offsets from start never step past end (which may be date.max)
+    return sum(daily.get(start + timedelta(days=offset), 0) for offset in range((end - start).days + 1))
+
+
+def check_as_of(as_of):
+    """Raise ValueError unless the look-back windows of ``as_of`` fit the calendar"""
+    try:
+        _shift_month(as_of.replace(day=1), -SEASONAL_MONTHS)
+        as_of - timedelta(days=LOOKBACK_DAYS)
+    except (OverflowError, ValueError):
+        raise ValueError(f"as_of {as_of.isoformat()} is too early to forecast from")
+
+
+def history_start(conn, as_of):
+    """First day of expense history (for every category), capped at ``as_of``"""
+    first = conn.execute("SELECT MIN(day) FROM totals_by_day WHERE type = 'expense'").fetchone()[0]
+    if not first:
+        return as_of
+    try:
+        return min(date.fromisoformat(first), as_of)
+    except ValueError:  # malformed dates sort first; fall back to the full window
+        return _shift_month(as_of.replace(day=1), -SEASONAL_MONTHS)
+
+
+def project(daily, as_of, history_start):
+    """Projection for one category as a dict of integer cents
+
+    ``daily`` maps dates to the category's spend that day; ``history_start``
+    is the first day with any data, so young histories are not diluted by
+    days before it.
+    """
+    month_start = as_of.replace(day=1)
+    month_end = _month_end(month_start)
+    spent = _total(daily, month_start, as_of)
+    days_left = (month_end - as_of).days
+
+    window_start = max(as_of - timedelta(days=LOOKBACK_DAYS), history_start)
+    window_days = (as_of - window_start).days
+    moving_average = (
+        _total(daily, window_start, as_of - timedelta(days=1)) / window_days if window_days > 0 else 0.0
+    )
+    trend = moving_average * days_left
+
+    # Spend after this day of the month in each earlier month with history
+    rests = []
+    for back in range(1, SEASONAL_MONTHS + 1):
+        earlier = _shift_month(month_start, -back)
+        if _month_end(earlier) < history_start:
+            break
+        earlier_end = _month_end(earlier)
+        if as_of.day < earlier_end.day:
+            rests.append(_total(daily, earlier.replace(day=as_of.day + 1), earlier_end))
+        else:
+            rests.append(0)
+
+    weight = len(rests) / SEASONAL_MONTHS
+    seasonal = sum(rests) / len(rests) if rests else 0.0
+    remaining = round(weight * seasonal + (1 - weight) * trend) if days_left else 0
+
+    return {
+        "spent": spent,
+        "projected_remaining": remaining,
+        "projected": spent + remaining,
+        "daily_average": round(moving_average),
+        "seasonal_months": len(rests),
+    }
+
+
+def project_categories(conn, names, as_of, start_of_history=None):
+    """Projections for many expense categories from one rollup scan"""
+    if start_of_history is None:
+        start_of_history = history_start(conn, as_of)
+
+    start = min(_shift_month(as_of.replace(day=1), -SEASONAL_MONTHS), as_of - timedelta(days=LOOKBACK_DAYS))
+    placeholders = ", ".join("?" for _ in names)
+    daily = {name: {} for name in names}
+    for name, day, total in conn.execute(
+        "SELECT category, day, total_cents FROM totals_by_day "
+        f"WHERE type = 'expense' AND day BETWEEN ? AND ? AND category IN ({placeholders})",
+        [start.isoformat(), as_of.isoformat(), *names]
+    ):
+        try:
+            daily[name][date.fromisoformat(day)] = total
+        except ValueError:
+            continue
+    return {name: project(daily[name], as_of, start_of_history) for name in names}
+
+
+class ForecastCache:
+    """Per-category projections keyed by (day, history start, budget, rollup count and total)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def forecast(self, conn, as_of):
+        """``[(name, budget_cents, projection)]`` for every expense category
+
+        Runs on a reader connection; only categories whose signature changed
+        since they were cached are recomputed, all in one batch. The history
+        start is shared by every category, so moving it invalidates them all.
+        """
+        check_as_of(as_of)
+        first = history_start(conn, as_of)
+        signatures = {
+            name: (as_of, first, budget, count, total)
+            for name, budget, count, total in conn.execute('''
+                SELECT c.name, c.budget_cents, COALESCE(r.count, 0), COALESCE(r.total_cents, 0)
+                FROM categories c
+                LEFT JOIN totals_by_category r ON r.category = c.name AND r.type = 'expense'
+                WHERE c.type = 'expense'
+            ''')
+        }
+        with self._lock:
+            stale = [
+                name for name, signature in signatures.items()
+                if self._entries.get(name, (None,))[0] != signature
+            ]
+            if stale:
+                for name, projection in project_categories(conn, stale, as_of, first).items():
+                    self._entries[name] = (signatures[name], projection)
+            self._entries = {name: self._entries[name] for name in signatures}
+            self.misses += len(stale)
+            self.hits += len(signatures) - len(stale)
+            return [
+                (name, signature[2], self._entries[name][1])
+                for name, signature in signatures.items()
+            ]
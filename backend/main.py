@@ -3,16 +3,54 @@ Budget Tracker Backend API
 FastAPI server for managing budget data
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError, field_validator
 from typing import List, Optional
 from datetime import datetime, date
+from contextlib import closing
+from itertools import islice
 import sqlite3
+import calendar
+import csv
+import faulthandler
+import io
 import json
 import os
+import signal
+import time
 
-app = FastAPI(title="Budget Tracker API", version="1.0.0")
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+import analytics
+import archive
+from caching import cache_headers, etag_matches, make_etag, not_modified
+import forecast
+import metrics
+import slow_queries
+import sync
+from migrations import SCHEMA_VERSION, migrate
+from money import from_cents, to_cents
+from pagination import (
+    CATEGORY_COLUMNS, MAX_PAGE_SIZE, ORDER_BY, TRANSACTION_COLUMNS, encode_cursor, transaction_filters,
+)
+import search
+from shards import USER_HEADER, Shard, ShardManager
+import trends
+
+# orjson-backed responses when available; list endpoints return these
+# directly so trusted database rows skip response_model re-validation
+FastJSONResponse = ORJSONResponse if orjson is not None else JSONResponse
+
+app = FastAPI(
+    title="Budget Tracker API",
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+)
 
 # Enable CORS for Flutter app
 app.add_middleware(
@@ -21,68 +59,56 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Thread stack dumps on demand for the launcher's hung-backend watchdog
+if hasattr(signal, "SIGUSR1"):
+    faulthandler.register(signal.SIGUSR1, all_threads=True)
 
-# Database setup
-DATABASE_PATH = "budget_tracker.db"
+# Database setup: one file per user (selected by the X-Budget-User header),
+# with the default database serving requests that name no user
+DATABASE_PATH = os.environ.get("BUDGET_TRACKER_DB", "budget_tracker.db")
+slow_query_log = slow_queries.from_environment()
+shards = ShardManager(DATABASE_PATH, observers=[metrics.QueryMetrics(), slow_query_log])
+pool = shards.default.pool
+
+def _write_queue_totals():
+    pending = batches = operations = 0
+    for shard in shards.open_shards:
+        stats = shard.write_queue.stats.snapshot()
+        pending += shard.write_queue.pending
+        batches += stats["batches"]
+        operations += stats["operations"]
+    return pending, (operations / batches) if batches else 0.0
+
+metrics.registry.register(metrics.CallbackGauge(
+    "db_executor_running", "Database calls currently executing", lambda: shards.stats.snapshot()["running"]))
+metrics.registry.register(metrics.CallbackGauge(
+    "db_executor_queued", "Database calls waiting for an executor thread", lambda: shards.stats.snapshot()["queued"]))
+metrics.registry.register(metrics.CallbackGauge(
+    "db_executor_queue_time_avg_seconds", "Mean time database calls waited for an executor thread",
+    lambda: shards.stats.snapshot()["queue_time_avg_ms"] / 1000))
+metrics.registry.register(metrics.CallbackGauge(
+    "db_write_queue_pending", "Writes waiting for the next group commit", lambda: _write_queue_totals()[0]))
+metrics.registry.register(metrics.CallbackGauge(
+    "db_write_batch_size_avg", "Mean number of writes applied per group commit (open shards)",
+    lambda: _write_queue_totals()[1]))
+metrics.registry.register(metrics.CallbackGauge(
+    "db_shards_open", "Per-user database shards currently open", lambda: shards.snapshot()["open"]))
 
 def init_database():
-    """Initialize SQLite database with required tables"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Transactions table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            amount REAL NOT NULL,
-            category TEXT NOT NULL,
-            type TEXT NOT NULL CHECK (type IN ('income', 'expense')),
-            date TEXT NOT NULL,
-            time TEXT NOT NULL,
-            description TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Categories table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS categories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            type TEXT NOT NULL CHECK (type IN ('income', 'expense')),
-            budget REAL DEFAULT 0,
-            icon TEXT DEFAULT 'category',
-            color TEXT DEFAULT '#2196F3',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Insert default categories
-    default_categories = [
-        ('Food & Dining', 'expense', 600.0, 'restaurant', '#FF9800'),
-        ('Transportation', 'expense', 400.0, 'directions_car', '#2196F3'),
-        ('Shopping', 'expense', 350.0, 'shopping_bag', '#9C27B0'),
-        ('Entertainment', 'expense', 200.0, 'movie', '#009688'),
-        ('Health', 'expense', 300.0, 'medical_services', '#F44336'),
-        ('Education', 'expense', 250.0, 'school', '#3F51B5'),
-        ('Utilities', 'expense', 500.0, 'electrical_services', '#FFC107'),
-        ('Rent', 'expense', 1200.0, 'home', '#795548'),
-        ('Salary', 'income', 0.0, 'work', '#4CAF50'),
-        ('Freelance', 'income', 0.0, 'laptop', '#2196F3'),
-        ('Business', 'income', 0.0, 'business', '#9C27B0'),
-        ('Investment', 'income', 0.0, 'trending_up', '#009688'),
-    ]
-    
-    for category in default_categories:
-        cursor.execute('''
-            INSERT OR IGNORE INTO categories (name, type, budget, icon, color) 
-            VALUES (?, ?, ?, ?, ?)
-        ''', category)
-    
-    conn.commit()
-    conn.close()
+    """Bring the SQLite schema up to the latest migration"""
+    applied = migrate(pool)
+    for version, description in applied:
+        print(f"Applied schema migration {version}: {description}")
+    if not applied:
+        print(f"Database schema up to date (version {SCHEMA_VERSION})")
+
+# Cold-start reporting: seconds from launcher spawn (or import) to first /health
+LAUNCH_TS = float(os.environ.get("BUDGET_TRACKER_LAUNCH_TS") or time.time())
+first_healthy_seconds = None
 
 # Pydantic models
 class TransactionCreate(BaseModel):
@@ -93,17 +119,39 @@ class TransactionCreate(BaseModel):
     date: str
     time: str
     description: Optional[str] = None
+    
+    @field_validator("amount")
+    @classmethod
+    def round_to_cents(cls, value):
+        """Amounts are stored in integer cents"""
+        return from_cents(to_cents(value))
 
 class Transaction(TransactionCreate):
     id: int
     created_at: str
 
+class BatchItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BatchResult(BaseModel):
+    inserted: int
+    failed: int
+    results: List[BatchItemResult]
+
 class CategoryCreate(BaseModel):
     name: str
     type: str  # 'income' or 'expense'
     budget: float = 0.0
     icon: str = 'category'
     color: str = '#2196F3'
+    
+    @field_validator("budget")
+    @classmethod
+    def round_to_cents(cls, value):
+        """Budgets are stored in integer cents"""
+        return from_cents(to_cents(value))
 
 class Category(CategoryCreate):
     id: int
@@ -116,10 +164,218 @@ class BudgetSummary(BaseModel):
     budget_used: float
     budget_remaining: float
 
+# Database work units (run on the database executor)
+def _insert_transaction(conn, transaction):
+    cursor = conn.execute('''
+        INSERT INTO transactions (title, amount_cents, category, type, date, time, description)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        transaction.title,
+        to_cents(transaction.amount),
+        transaction.category,
+        transaction.type,
+        transaction.date,
+        transaction.time,
+        transaction.description
+    ))
+    return cursor.lastrowid
+
+def _insert_transactions(conn, transactions):
+    conn.executemany('''
+        INSERT INTO transactions (title, amount_cents, category, type, date, time, description)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [
+        (t.title, to_cents(t.amount), t.category, t.type, t.date, t.time, t.description)
+        for t in transactions
+    ])
+    # AUTOINCREMENT ids are consecutive inside one write transaction
+    last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+    return list(range(last_id - len(transactions) + 1, last_id + 1))
+
+def _delete_transaction(conn, transaction_id):
+    cursor = conn.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
+    return cursor.rowcount
+
+def _insert_category(conn, category):
+    cursor = conn.execute('''
+        INSERT INTO categories (name, type, budget_cents, icon, color)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (
+        category.name,
+        category.type,
+        to_cents(category.budget),
+        category.icon,
+        category.color
+    ))
+    return cursor.lastrowid
+
+async def get_shard(user: Optional[str] = Header(None, alias=USER_HEADER)):
+    """Route the request to the caller's database shard for its whole lifetime"""
+    try:
+        shard = await shards.acquire(user)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        yield shard
+    finally:
+        shards.release(shard)
+
+async def _current_etag(shard, variant=None):
+    """ETag for the shard's current data version, read without touching the data
+
+    ``variant`` distinguishes responses that also depend on something other
+    than the data, such as the current date.
+    """
+    row = await shard.db.fetchone("SELECT version FROM data_version WHERE id = 1")
+    version = row[0] if variant is None else f"{row[0]}-{variant}"
+    return make_etag(version, shard.key)
+
+def _transaction_page(conn, where, params, limit, date_from, date_to):
+    # Hot rows only, unless the range reaches into archived years
+    archives = archive.archived_years(conn, date_from, date_to)
+    if archives:
+        with closing(archive.iter_transactions(conn, where, params, archives)) as rows:
+            page = list(islice(rows, limit))
+    else:
+        page = conn.execute(
+            f"SELECT {TRANSACTION_COLUMNS} FROM transactions{where} {ORDER_BY} LIMIT ?", [*params, limit]
+        ).fetchall()
+    return [dict(zip(EXPORT_COLUMNS, row)) for row in page]
+
+def _trend_data(conn, granularity, start, end, type, category):
+    if category:
+        categories = [category]
+    else:
+        categories = [row[0] for row in conn.execute(
+            "SELECT name FROM categories WHERE type = ?", (type,)
+        )]
+    rows = trends.trend_rows(conn, granularity, start, end, type, category)
+    return categories, rows
+
+def _budget_totals(conn):
+    cursor = conn.cursor()
+    
+    # Income and expense totals (in cents) from the trigger-maintained rollup
+    cursor.execute("SELECT type, total_cents FROM totals_by_type")
+    totals = dict(cursor.fetchall())
+    total_income = totals.get('income', 0)
+    total_expenses = totals.get('expense', 0)
+    
+    # Get total budget from categories
+    cursor.execute("SELECT COALESCE(SUM(budget_cents), 0) FROM categories WHERE type = 'expense'")
+    total_budget = cursor.fetchone()[0]
+    
+    return total_income, total_expenses, total_budget
+
+# Batch ingestion helpers
+BATCH_MAX_ITEMS = int(os.environ.get("BUDGET_BATCH_MAX_ITEMS", "50000"))
+BATCH_MAX_BODY_BYTES = int(os.environ.get("BUDGET_BATCH_MAX_BODY_BYTES", str(64 * 1024 * 1024)))
+BATCH_MAX_LINE_BYTES = int(os.environ.get("BUDGET_BATCH_MAX_LINE_BYTES", str(64 * 1024)))
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+TRANSACTION_TYPES = ("income", "expense")
+INVALID_JSON = object()
+
+def _too_large(detail):
+    return HTTPException(status_code=413, detail=detail)
+
+async def _iter_body(request):
+    """Yield the body in chunks, failing with 413 once it passes BATCH_MAX_BODY_BYTES"""
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > BATCH_MAX_BODY_BYTES:
+        raise _too_large(f"Body exceeds the limit of {BATCH_MAX_BODY_BYTES} bytes")
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > BATCH_MAX_BODY_BYTES:
+            raise _too_large(f"Body exceeds the limit of {BATCH_MAX_BODY_BYTES} bytes")
+        yield chunk
+
+async def _iter_ndjson(request):
+    """Yield one decoded value per non-empty line of a streamed body
+
+    Lines that are not valid JSON are yielded as ``INVALID_JSON`` so they
+    are reported as per-item errors instead of failing the whole batch.
+    Raises a 413 as soon as the body, a single line or the item count goes
+    over its limit, so an oversized upload is never buffered whole.
+    """
+    buffer = bytearray()
+    items = 0
+    async for chunk in _iter_body(request):
+        scanned = len(buffer)  # only the new bytes can hold a newline
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", scanned)
+            if end < 0:
+                break
+            line = bytes(buffer[start:end])
+            start = scanned = end + 1
+            if len(line) > BATCH_MAX_LINE_BYTES:
+                raise _too_large(f"Line exceeds the limit of {BATCH_MAX_LINE_BYTES} bytes")
+            if line.strip():
+                items += 1
+                if items > BATCH_MAX_ITEMS:
+                    raise _too_large(f"Batch exceeds the limit of {BATCH_MAX_ITEMS} transactions")
+                yield _decode_ndjson_line(line)
+        del buffer[:start]
+        if len(buffer) > BATCH_MAX_LINE_BYTES:
+            raise _too_large(f"Line exceeds the limit of {BATCH_MAX_LINE_BYTES} bytes")
+    if buffer.strip():
+        if items + 1 > BATCH_MAX_ITEMS:
+            raise _too_large(f"Batch exceeds the limit of {BATCH_MAX_ITEMS} transactions")
+        yield _decode_ndjson_line(bytes(buffer))
+
+def _decode_ndjson_line(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return INVALID_JSON
+
+def _validate_batch_item(raw):
+    """Return (TransactionCreate, None) or (None, error message)"""
+    if raw is INVALID_JSON:
+        return None, "Invalid JSON"
+    if not isinstance(raw, dict):
+        return None, "Item must be a JSON object"
+    try:
+        transaction = TransactionCreate.model_validate(raw)
+    except ValidationError as e:
+        return None, "; ".join(
+            f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+            for err in e.errors()
+        )
+    if transaction.type not in TRANSACTION_TYPES:
+        return None, "type: must be 'income' or 'expense'"
+    return transaction, None
+
+# Export encoders (same order as TRANSACTION_COLUMNS)
+EXPORT_COLUMNS = ("id", "title", "amount", "category", "type", "date", "time", "description", "created_at")
+
+async def _csv_export(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+async def _ndjson_export(chunks):
+    async for rows in chunks:
+        yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows)
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
     init_database()
+    shards.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await shards.close()
 
 # Health check endpoint
 @app.get("/")
@@ -128,75 +384,97 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    global first_healthy_seconds
+    if first_healthy_seconds is None:
+        first_healthy_seconds = time.time() - LAUNCH_TS
+        print(f"First healthy response {first_healthy_seconds:.2f}s after launch")
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "time_to_healthy_seconds": round(first_healthy_seconds, 3),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text-format request, query and executor metrics"""
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/debug/slow-queries")
+async def get_slow_queries(limit: int = Query(20, ge=1, le=500)):
+    """Statements that exceeded the slow-query threshold, slowest first"""
+    if slow_query_log is None:
+        return {"enabled": False, "threshold_ms": None, "queries": []}
+    return {
+        "enabled": True,
+        "threshold_ms": slow_query_log.threshold_ms,
+        "log_path": slow_query_log.log_path,
+        "queries": slow_query_log.summary(limit),
+    }
+
+@app.get("/debug/db")
+async def database_stats():
+    """Database executor, shard and group-commit queue statistics"""
+    write_queue = shards.default.write_queue
+    pending, batch_size_avg = _write_queue_totals()
+    return {
+        "max_workers": shards.max_workers,
+        **shards.stats.snapshot(),
+        "shards": shards.snapshot(),
+        "write_queue": {
+            "max_batch": write_queue.max_batch,
+            "max_delay_ms": write_queue.max_delay * 1000,
+            "pending": pending,
+            "batch_size_avg": batch_size_avg,
+        },
+    }
 
 # Transaction endpoints
 @app.get("/transactions", response_model=List[Transaction])
 async def get_transactions(
+    request: Request,
     type: Optional[str] = None,
     category: Optional[str] = None,
-    limit: Optional[int] = 100
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    shard: Shard = Depends(get_shard)
 ):
-    """Get all transactions with optional filtering"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    query = "SELECT * FROM transactions WHERE 1=1"
-    params = []
-    
-    if type:
-        query += " AND type = ?"
-        params.append(type)
+    """Get transactions newest first with optional filtering
+
+    Pages are keyed on (date, time, id). When more rows are available the
+    ``X-Next-Cursor`` response header carries the cursor for the next page.
+    Archived years are read transparently once the listing reaches them.
+    """
+    try:
+        where, params = transaction_filters(
+            type, category, date_from, date_to, min_amount, max_amount, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    if category:
-        query += " AND category = ?"
-        params.append(category)
+    etag = await _current_etag(shard)
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
-    query += " ORDER BY date DESC, time DESC LIMIT ?"
-    params.append(limit)
+    # Fetch one extra row to learn whether another page exists
+    rows = await shard.db.read(_transaction_page, where, params, limit + 1, date_from, date_to)
     
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
+    headers = cache_headers(etag)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last["date"], last["time"], last["id"])
     
-    transactions = []
-    for row in rows:
-        transactions.append(Transaction(
-            id=row[0],
-            title=row[1],
-            amount=row[2],
-            category=row[3],
-            type=row[4],
-            date=row[5],
-            time=row[6],
-            description=row[7],
-            created_at=row[8]
-        ))
-    
-    return transactions
+    return FastJSONResponse(rows, headers=headers)
 
 @app.post("/transactions", response_model=Transaction)
-async def create_transaction(transaction: TransactionCreate):
+async def create_transaction(transaction: TransactionCreate, shard: Shard = Depends(get_shard)):
     """Create a new transaction"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        INSERT INTO transactions (title, amount, category, type, date, time, description)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        transaction.title,
-        transaction.amount,
-        transaction.category,
-        transaction.type,
-        transaction.date,
-        transaction.time,
-        transaction.description
-    ))
-    
-    transaction_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    transaction_id = await shard.write_queue.submit(_insert_transaction, transaction)
+    shard.changes.notify()
     
     # Return the created transaction
     return Transaction(
@@ -211,15 +489,151 @@ async def create_transaction(transaction: TransactionCreate):
         created_at=datetime.now().isoformat()
     )
 
+@app.post("/transactions/batch", response_model=BatchResult)
+async def create_transactions_batch(request: Request, shard: Shard = Depends(get_shard)):
+    """Create many transactions in a single commit
+
+    Accepts a JSON array or, with ``Content-Type: application/x-ndjson``, one
+    transaction object per line. Items are validated individually; valid items
+    are inserted together and each result reports its new id or its error.
+    Bodies over BATCH_MAX_BODY_BYTES, NDJSON lines over BATCH_MAX_LINE_BYTES
+    and batches over BATCH_MAX_ITEMS are rejected with 413.
+    """
+    if request.headers.get("content-type", "").split(";")[0].strip() in NDJSON_TYPES:
+        raw_items = [item async for item in _iter_ndjson(request)]
+    else:
+        body = b"".join([chunk async for chunk in _iter_body(request)])
+        try:
+            raw_items = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array")
+        if not isinstance(raw_items, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array")
+    
+    if len(raw_items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds the limit of {BATCH_MAX_ITEMS} transactions"
+        )
+    
+    results = []
+    valid = []
+    for index, raw in enumerate(raw_items):
+        transaction, error = _validate_batch_item(raw)
+        if error:
+            results.append(BatchItemResult(index=index, error=error))
+        else:
+            valid.append((index, transaction))
+    
+    if valid:
+        ids = await shard.db.write(_insert_transactions, [t for _, t in valid])
+        shard.changes.notify()
+        for (index, _), transaction_id in zip(valid, ids):
+            results.append(BatchItemResult(index=index, id=transaction_id))
+        results.sort(key=lambda r: r.index)
+    
+    return BatchResult(inserted=len(valid), failed=len(results) - len(valid), results=results)
+
+@app.get("/transactions/search", response_model=List[Transaction])
+async def search_transactions(
+    request: Request,
+    q: str,
+    order: str = Query("rank", pattern="^(rank|date)$"),
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    shard: Shard = Depends(get_shard)
+):
+    """Full-text search over transaction titles and descriptions
+
+    Terms ending in ``*`` match as prefixes. Results are ordered by relevance
+    (``order=rank``) or newest first (``order=date``) and paginated with the
+    ``X-Next-Cursor`` header like GET /transactions. Archived transactions
+    are not searched.
+    """
+    match = search.fts_query(q)
+    if match is None:
+        raise HTTPException(status_code=400, detail="Search query has no terms")
+    
+    try:
+        query, params = search.search_query(
+            match, order, cursor, limit + 1,
+            type=type, category=category, date_from=date_from, date_to=date_to,
+            min_amount=min_amount, max_amount=max_amount
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    etag = await _current_etag(shard)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    rows = await shard.db.fetchall_dicts(query, params)
+    
+    headers = cache_headers(etag)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = search.next_cursor(order, rows[-1])
+    for row in rows:
+        row.pop("rank", None)
+    
+    return FastJSONResponse(rows, headers=headers)
+
+@app.get("/transactions/export")
+async def export_transactions(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    shard: Shard = Depends(get_shard)
+):
+    """Stream every matching transaction as CSV or NDJSON
+
+    Rows are read in fixed-size chunks and encoded as they arrive, so memory
+    stays flat regardless of how many transactions match.
+    """
+    try:
+        where, params = transaction_filters(
+            type, category, date_from, date_to, min_amount, max_amount
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    archives = await shard.db.read(archive.archived_years, date_from, date_to)
+    if archives:
+        chunks = shard.db.stream_rows(archive.iter_transactions, where, params, archives)
+    else:
+        query = f"SELECT {TRANSACTION_COLUMNS} FROM transactions{where} {ORDER_BY}"
+        chunks = shard.db.stream(query, params)
+    
+    if format == "ndjson":
+        body = _ndjson_export(chunks)
+        media_type = "application/x-ndjson"
+    else:
+        body = _csv_export(chunks)
+        media_type = "text/csv"
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'}
+    )
+
 @app.get("/transactions/{transaction_id}", response_model=Transaction)
-async def get_transaction(transaction_id: int):
+async def get_transaction(transaction_id: int, shard: Shard = Depends(get_shard)):
     """Get a specific transaction by ID"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM transactions WHERE id = ?", (transaction_id,))
-    row = cursor.fetchone()
-    conn.close()
+    row = await shard.db.fetchone(
+        f"SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE id = ?", (transaction_id,)
+    )
+    if not row:
+        row = await shard.db.read(archive.find_transaction, transaction_id)
     
     if not row:
         raise HTTPException(status_code=404, detail="Transaction not found")
@@ -237,72 +651,43 @@ async def get_transaction(transaction_id: int):
     )
 
 @app.delete("/transactions/{transaction_id}")
-async def delete_transaction(transaction_id: int):
+async def delete_transaction(transaction_id: int, shard: Shard = Depends(get_shard)):
     """Delete a transaction"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
+    deleted = await shard.write_queue.submit(_delete_transaction, transaction_id)
     
-    if cursor.rowcount == 0:
-        conn.close()
+    if deleted == 0:
+        if await shard.db.read(archive.find_transaction, transaction_id):
+            raise HTTPException(status_code=409, detail="Archived transactions are read-only")
         raise HTTPException(status_code=404, detail="Transaction not found")
-    
-    conn.commit()
-    conn.close()
+    if shard.analytics is not None:
+        shard.analytics.discard(transaction_id)
+    shard.changes.notify()
     
     return {"message": "Transaction deleted successfully"}
 
 # Category endpoints
 @app.get("/categories", response_model=List[Category])
-async def get_categories(type: Optional[str] = None):
+async def get_categories(request: Request, type: Optional[str] = None, shard: Shard = Depends(get_shard)):
     """Get all categories with optional type filtering"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+    etag = await _current_etag(shard)
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
     if type:
-        cursor.execute("SELECT * FROM categories WHERE type = ? ORDER BY name", (type,))
+        rows = await shard.db.fetchall_dicts(
+            f"SELECT {CATEGORY_COLUMNS} FROM categories WHERE type = ? ORDER BY name", (type,)
+        )
     else:
-        cursor.execute("SELECT * FROM categories ORDER BY name")
-    
-    rows = cursor.fetchall()
-    conn.close()
+        rows = await shard.db.fetchall_dicts(f"SELECT {CATEGORY_COLUMNS} FROM categories ORDER BY name")
     
-    categories = []
-    for row in rows:
-        categories.append(Category(
-            id=row[0],
-            name=row[1],
-            type=row[2],
-            budget=row[3],
-            icon=row[4],
-            color=row[5],
-            created_at=row[6]
-        ))
-    
-    return categories
+    return FastJSONResponse(rows, headers=cache_headers(etag))
 
 @app.post("/categories", response_model=Category)
-async def create_category(category: CategoryCreate):
+async def create_category(category: CategoryCreate, shard: Shard = Depends(get_shard)):
     """Create a new category"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('''
-            INSERT INTO categories (name, type, budget, icon, color)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
-            category.name,
-            category.type,
-            category.budget,
-            category.icon,
-            category.color
-        ))
-        
-        category_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        category_id = await shard.db.write(_insert_category, category)
+        shard.changes.notify()
         
         return Category(
             id=category_id,
@@ -315,78 +700,241 @@ async def create_category(category: CategoryCreate):
         )
     
     except sqlite3.IntegrityError:
-        conn.close()
         raise HTTPException(status_code=400, detail="Category already exists")
 
 # Budget summary endpoint
 @app.get("/budget/summary", response_model=BudgetSummary)
-async def get_budget_summary():
+async def get_budget_summary(request: Request, shard: Shard = Depends(get_shard)):
     """Get budget summary with income, expenses, and balance"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Get total income
-    cursor.execute("SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE type = 'income'")
-    total_income = cursor.fetchone()[0]
+    etag = await _current_etag(shard)
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
-    # Get total expenses
-    cursor.execute("SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE type = 'expense'")
-    total_expenses = cursor.fetchone()[0]
-    
-    # Get total budget from categories
-    cursor.execute("SELECT COALESCE(SUM(budget), 0) FROM categories WHERE type = 'expense'")
-    total_budget = cursor.fetchone()[0]
-    
-    conn.close()
+    total_income, total_expenses, total_budget = await shard.db.read(_budget_totals)
     
     balance = total_income - total_expenses
     budget_remaining = total_budget - total_expenses
     
-    return BudgetSummary(
-        total_income=total_income,
-        total_expenses=total_expenses,
-        balance=balance,
-        budget_used=total_expenses,
-        budget_remaining=budget_remaining
+    # Exact integer arithmetic in cents; decimal amounts only at the boundary
+    summary = BudgetSummary(
+        total_income=from_cents(total_income),
+        total_expenses=from_cents(total_expenses),
+        balance=from_cents(balance),
+        budget_used=from_cents(total_expenses),
+        budget_remaining=from_cents(budget_remaining)
     )
+    return FastJSONResponse(summary.model_dump(), headers=cache_headers(etag))
 
 # Category spending analysis
 @app.get("/budget/categories")
-async def get_category_spending():
+async def get_category_spending(request: Request, shard: Shard = Depends(get_shard)):
     """Get spending analysis by category"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+    etag = await _current_etag(shard)
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
-    cursor.execute('''
+    rows = await shard.db.fetchall('''
         SELECT 
             c.name,
-            c.budget,
+            c.budget_cents,
             c.icon,
             c.color,
-            COALESCE(SUM(t.amount), 0) as spent
+            COALESCE(r.total_cents, 0) as spent
         FROM categories c
-        LEFT JOIN transactions t ON c.name = t.category AND t.type = 'expense'
+        LEFT JOIN totals_by_category r ON r.category = c.name AND r.type = 'expense'
         WHERE c.type = 'expense'
-        GROUP BY c.id, c.name, c.budget, c.icon, c.color
         ORDER BY spent DESC
     ''')
     
-    rows = cursor.fetchall()
-    conn.close()
-    
     categories = []
     for row in rows:
+        budget, spent = row[1], row[4]  # cents
         categories.append({
             'name': row[0],
-            'budget': row[1],
+            'budget': from_cents(budget),
             'icon': row[2],
             'color': row[3],
-            'spent': row[4],
-            'remaining': row[1] - row[4],
-            'percentage': (row[4] / row[1] * 100) if row[1] > 0 else 0
+            'spent': from_cents(spent),
+            'remaining': from_cents(budget - spent),
+            'percentage': (spent * 100 / budget) if budget > 0 else 0
         })
     
-    return categories
+    return FastJSONResponse(categories, headers=cache_headers(etag))
+
+# Month-end forecast
+@app.get("/budget/forecast")
+async def get_spending_forecast(
+    request: Request,
+    as_of: Optional[str] = None,
+    shard: Shard = Depends(get_shard)
+):
+    """Project month-end spend for every expense category
+
+    Blends a moving average of recent daily spend with a seasonal baseline
+    of earlier months, read from the daily rollup. Projections are cached
+    per category until a transaction in that category changes its totals.
+    ``as_of`` (default today) sets the day the month is projected from.
+    """
+    try:
+        day = date.fromisoformat(as_of) if as_of else date.today()
+        forecast.check_as_of(day)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    etag = await _current_etag(shard, day.isoformat())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    projections = await shard.db.read(shard.forecasts.forecast, day)
+    
+    categories = []
+    for name, budget, projection in projections:  # cents
+        categories.append({
+            'name': name,
+            'budget': from_cents(budget),
+            'spent': from_cents(projection['spent']),
+            'projected': from_cents(projection['projected']),
+            'projected_remaining': from_cents(projection['projected_remaining']),
+            'daily_average': from_cents(projection['daily_average']),
+            'projected_over_budget': from_cents(max(projection['projected'] - budget, 0)) if budget > 0 else 0.0,
+            'on_track': budget <= 0 or projection['projected'] <= budget,
+        })
+    categories.sort(key=lambda c: c['projected'], reverse=True)
+    
+    return FastJSONResponse({
+        'as_of': day.isoformat(),
+        'month': day.isoformat()[:7],
+        'days_elapsed': day.day,
+        'days_in_month': calendar.monthrange(day.year, day.month)[1],
+        'spent': from_cents(sum(p['spent'] for _, _, p in projections)),
+        'projected': from_cents(sum(p['projected'] for _, _, p in projections)),
+        'budget': from_cents(sum(budget for _, budget, _ in projections)),
+        'categories': categories,
+    }, headers=cache_headers(etag))
+
+# Spending trends
+@app.get("/budget/trends")
+async def get_spending_trends(
+    request: Request,
+    granularity: str = Query("month", pattern="^(day|week|month)$"),
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    category: Optional[str] = None,
+    type: str = Query("expense", pattern="^(income|expense)$"),
+    shard: Shard = Depends(get_shard)
+):
+    """Get dense per-category totals bucketed by day, week or month
+
+    Served from the day and month rollup tables; weeks start on Monday.
+    """
+    try:
+        start, end, labels = trends.resolve_range(granularity, date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # ``to`` defaults to today, so the window moves even when the data does not
+    etag = await _current_etag(shard, end.isoformat())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    categories, rows = await shard.db.read(_trend_data, granularity, start, end, type, category)
+    
+    return FastJSONResponse({
+        "granularity": granularity,
+        "type": type,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "periods": labels,
+        "series": trends.dense_series(labels, categories, rows),
+    }, headers=cache_headers(etag))
+
+# Filtered aggregation
+@app.get("/budget/aggregate")
+async def get_aggregate(
+    request: Request,
+    group_by: str = Query("category", pattern="^(category|type|day|week|month)$"),
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    shard: Shard = Depends(get_shard)
+):
+    """Get totals and counts of matching transactions grouped by category, type or period
+
+    Covers hot and archived transactions. Answered from the shard's in-memory
+    column store when NumPy is installed, otherwise aggregated in SQL.
+    Weeks start on Monday.
+    """
+    try:
+        where, params = transaction_filters(
+            type, category, date_from, date_to, min_amount, max_amount
+        )
+        min_cents = to_cents(min_amount) if min_amount is not None else None
+        max_cents = to_cents(max_amount) if max_amount is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    etag = await _current_etag(shard)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    if shard.analytics is not None:
+        groups = await shard.db.read(
+            shard.analytics.aggregate, group_by, type, category, date_from, date_to, min_cents, max_cents
+        )
+    else:
+        groups = await shard.db.read(analytics.sql_aggregate, group_by, where, params, date_from, date_to)
+    
+    return FastJSONResponse({
+        "group_by": group_by,
+        "engine": "columnar" if shard.analytics is not None else "sql",
+        "groups": [
+            {"key": key, "total": from_cents(total), "count": count}
+            for key, total, count in groups
+        ],
+        "total": from_cents(sum(total for _, total, _ in groups)),
+        "count": sum(count for _, _, count in groups),
+    }, headers=cache_headers(etag))
+
+# Delta sync
+@app.get("/sync")
+async def get_changes(
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(sync.SYNC_PAGE_SIZE, ge=1, le=sync.SYNC_MAX_PAGE_SIZE),
+    shard: Shard = Depends(get_shard)
+):
+    """Get transactions and categories changed after sequence ``since``
+
+    Each changed row appears once in its current state, or by id under
+    ``deleted``. Keep ``next`` for the following call and repeat while
+    ``has_more``. Without ``since`` only the current sequence is returned,
+    to start from after a full fetch; 410 means ``since`` is too old and
+    everything must be fetched again.
+    """
+    try:
+        changes = await shard.db.read(sync.changes_since, since, limit)
+    except sync.SyncExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+
+    return FastJSONResponse(changes, headers={"Cache-Control": "no-store"})
+
+@app.get("/sync/stream")
+async def stream_changes(request: Request, shard: Shard = Depends(get_shard)):
+    """Server-Sent Events with the latest change sequence whenever it moves
+
+    Sends the current sequence on connect (unless it equals ``Last-Event-ID``)
+    and keepalive comments while idle; clients call GET /sync on each event.
+    """
+    last_event_id = request.headers.get("last-event-id", "")
+    last_seq = int(last_event_id) if last_event_id.isdigit() else None
+
+    return StreamingResponse(
+        sync.event_stream(shard.db, shard.changes, last_seq),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,233 @@
+"""
+Metrics
+Prometheus text-format counters, gauges and histograms for requests and queries
+"""
+
+import re
+import threading
+import time
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class CallbackGauge(_Metric):
+    """Gauge whose samples are read from ``callback()`` at scrape time
+
+    The callback returns either a number or a dict of label tuples to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, help, callback, labels=()):
+        super().__init__(name, help, labels)
+        self.callback = callback
+
+    def render(self):
+        lines = self._header()
+        samples = self.callback()
+        if not isinstance(samples, dict):
+            samples = {(): samples}
+        for labels, value in samples.items():
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = [(labels, (list(s[0]), s[1], s[2])) for labels, s in self._values.items()]
+        bound_names = self.labels + ("le",)
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                label_text = _format_labels(bound_names, labels + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{label_text} {cumulative}")
+            label_text = _format_labels(bound_names, labels + ("+Inf",))
+            lines.append(f"{self.name}_bucket{label_text} {count}")
+            label_text = _format_labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests handled", ("method", "route", "status")))
+REQUEST_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to produce the full HTTP response", ("method", "route")))
+RESPONSE_SIZE = registry.register(Histogram(
+    "http_response_size_bytes", "HTTP response body size", ("method", "route"), SIZE_BUCKETS))
+IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled"))
+QUERY_LATENCY = registry.register(Histogram(
+    "db_query_duration_seconds", "SQLite statement execution time", ("operation", "table")))
+QUERY_FETCH_TIME = registry.register(Counter(
+    "db_query_fetch_seconds_total", "Time spent fetching result rows", ("operation", "table")))
+QUERY_ROWS = registry.register(Histogram(
+    "db_query_rows", "Rows fetched or modified per call", ("operation", "table"), ROW_BUCKETS))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request metrics
+
+    Routes are labelled by their path template (``/transactions/{transaction_id}``)
+    so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        status = 500
+        size = 0
+        
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+        
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUESTS.inc(method, path, status)
+            REQUEST_LATENCY.observe(time.perf_counter() - started, method, path)
+            RESPONSE_SIZE.observe(size, method, path)
+
+
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+([A-Za-z_][A-Za-z0-9_]*)", re.IGNORECASE)
+_DML = {"SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH"}
+_MAX_CACHED_STATEMENTS = 1024
+
+
+class QueryMetrics:
+    """Query observer feeding the db_query_* metrics"""
+
+    def __init__(self):
+        self._labels = {}
+
+    def labels(self, sql):
+        """(operation, table) labels for a statement, cached per SQL string"""
+        labels = self._labels.get(sql)
+        if labels is None:
+            words = sql.split(None, 1)
+            operation = words[0].upper() if words else ""
+            match = _TABLE.search(sql) if operation in _DML else None
+            labels = (operation, match.group(1) if match else "")
+            if len(self._labels) < _MAX_CACHED_STATEMENTS:
+                self._labels[sql] = labels
+        return labels
+
+    def on_execute(self, cursor, sql, params, seconds):
+        labels = self.labels(sql)
+        QUERY_LATENCY.observe(seconds, *labels)
+        if cursor.rowcount >= 0:
+            QUERY_ROWS.observe(cursor.rowcount, *labels)
+
+    def on_fetch(self, cursor, sql, rows, seconds):
+        labels = self.labels(sql)
+        QUERY_FETCH_TIME.inc(*labels, amount=seconds)
+        QUERY_ROWS.observe(rows, *labels)
@@ -0,0 +1,629 @@
+"""
+Schema Migrations
+Ordered, versioned upgrade steps tracked through PRAGMA user_version
+"""
+
+from contextlib import closing
+
+from money import to_cents
+
+
+def _initial_schema(conn):
+    """Create tables and seed the default categories"""
+    # Transactions table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            amount REAL NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL CHECK (type IN ('income', 'expense')),
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Categories table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            type TEXT NOT NULL CHECK (type IN ('income', 'expense')),
+            budget REAL DEFAULT 0,
+            icon TEXT DEFAULT 'category',
+            color TEXT DEFAULT '#2196F3',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Insert default categories
+    default_categories = [
+        ('Food & Dining', 'expense', 600.0, 'restaurant', '#FF9800'),
+        ('Transportation', 'expense', 400.0, 'directions_car', '#2196F3'),
+        ('Shopping', 'expense', 350.0, 'shopping_bag', '#9C27B0'),
+        ('Entertainment', 'expense', 200.0, 'movie', '#009688'),
+        ('Health', 'expense', 300.0, 'medical_services', '#F44336'),
+        ('Education', 'expense', 250.0, 'school', '#3F51B5'),
+        ('Utilities', 'expense', 500.0, 'electrical_services', '#FFC107'),
+        ('Rent', 'expense', 1200.0, 'home', '#795548'),
+        ('Salary', 'income', 0.0, 'work', '#4CAF50'),
+        ('Freelance', 'income', 0.0, 'laptop', '#2196F3'),
+        ('Business', 'income', 0.0, 'business', '#9C27B0'),
+        ('Investment', 'income', 0.0, 'trending_up', '#009688'),
+    ]
+    
+    for category in default_categories:
+        conn.execute('''
+            INSERT OR IGNORE INTO categories (name, type, budget, icon, color) 
+            VALUES (?, ?, ?, ?, ?)
+        ''', category)
+
+
+def _transaction_indexes(conn):
+    """Indexes for the listing, filtering and per-category aggregation paths"""
+    # GET /transactions ordering: ORDER BY date DESC, time DESC
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_date_time
+        ON transactions (date, time)
+    ''')
+    
+    # GET /transactions?type=... and the per-type budget totals
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_type_date_time
+        ON transactions (type, date, time)
+    ''')
+    
+    # GET /transactions?category=...
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_category_date_time
+        ON transactions (category, date, time)
+    ''')
+    
+    # Covering index for the categories LEFT JOIN ... SUM(amount) aggregation
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_category_type_amount
+        ON transactions (category, type, amount)
+    ''')
+
+
+def _rollup_tables(conn):
+    """Running totals per type, per category and per month, kept by triggers"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS totals_by_type (
+            type TEXT PRIMARY KEY,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS totals_by_category (
+            category TEXT NOT NULL,
+            type TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (category, type)
+        )
+    ''')
+    
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS totals_by_month (
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, category, type)
+        )
+    ''')
+    
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO totals_by_type (type, total, count)
+            VALUES (NEW.type, NEW.amount, 1)
+            ON CONFLICT (type) DO UPDATE SET
+                total = total + excluded.total, count = count + 1;
+            
+            INSERT INTO totals_by_category (category, type, total, count)
+            VALUES (NEW.category, NEW.type, NEW.amount, 1)
+            ON CONFLICT (category, type) DO UPDATE SET
+                total = total + excluded.total, count = count + 1;
+            
+            INSERT INTO totals_by_month (month, category, type, total, count)
+            VALUES (substr(NEW.date, 1, 7), NEW.category, NEW.type, NEW.amount, 1)
+            ON CONFLICT (month, category, type) DO UPDATE SET
+                total = total + excluded.total, count = count + 1;
+        END
+    ''')
+    
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            UPDATE totals_by_type
+            SET total = total - OLD.amount, count = count - 1
+            WHERE type = OLD.type;
+            
+            UPDATE totals_by_category
+            SET total = total - OLD.amount, count = count - 1
+            WHERE category = OLD.category AND type = OLD.type;
+            
+            UPDATE totals_by_month
+            SET total = total - OLD.amount, count = count - 1
+            WHERE month = substr(OLD.date, 1, 7)
+              AND category = OLD.category AND type = OLD.type;
+        END
+    ''')
+    
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_update
+        AFTER UPDATE OF amount, category, type, date ON transactions
+        BEGIN
+            UPDATE totals_by_type
+            SET total = total - OLD.amount, count = count - 1
+            WHERE type = OLD.type;
+            
+            UPDATE totals_by_category
+            SET total = total - OLD.amount, count = count - 1
+            WHERE category = OLD.category AND type = OLD.type;
+            
+            UPDATE totals_by_month
+            SET total = total - OLD.amount, count = count - 1
+            WHERE month = substr(OLD.date, 1, 7)
+              AND category = OLD.category AND type = OLD.type;
+            
+            INSERT INTO totals_by_type (type, total, count)
+            VALUES (NEW.type, NEW.amount, 1)
+            ON CONFLICT (type) DO UPDATE SET
+                total = total + excluded.total, count = count + 1;
+            
+            INSERT INTO totals_by_category (category, type, total, count)
+            VALUES (NEW.category, NEW.type, NEW.amount, 1)
+            ON CONFLICT (category, type) DO UPDATE SET
+                total = total + excluded.total, count = count + 1;
+            
+            INSERT INTO totals_by_month (month, category, type, total, count)
+            VALUES (substr(NEW.date, 1, 7), NEW.category, NEW.type, NEW.amount, 1)
+            ON CONFLICT (month, category, type) DO UPDATE SET
+                total = total + excluded.total, count = count + 1;
+        END
+    ''')
+    
+    # Backfill from the existing rows
+    conn.execute('''
+        INSERT OR REPLACE INTO totals_by_type (type, total, count)
+        SELECT type, SUM(amount), COUNT(*) FROM transactions GROUP BY type
+    ''')
+    conn.execute('''
+        INSERT OR REPLACE INTO totals_by_category (category, type, total, count)
+        SELECT category, type, SUM(amount), COUNT(*) FROM transactions
+        GROUP BY category, type
+    ''')
+    conn.execute('''
+        INSERT OR REPLACE INTO totals_by_month (month, category, type, total, count)
+        SELECT substr(date, 1, 7), category, type, SUM(amount), COUNT(*) FROM transactions
+        GROUP BY substr(date, 1, 7), category, type
+    ''')
+
+
+def _data_version(conn):
+    """Single-row counter bumped by every write to transactions or categories"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    # Start from the current time in milliseconds so a recreated database
+    # never hands out a version (and so an ETag) an older file already used
+    conn.execute('''
+        INSERT OR IGNORE INTO data_version (id, version)
+        VALUES (1, CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER))
+    ''')
+    
+    for table in ("transactions", "categories"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_data_version_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE data_version SET version = version + 1 WHERE id = 1;
+                END
+            ''')
+
+
+def _daily_rollup(conn):
+    """Per-day running totals backing the day and week trend series"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS totals_by_day (
+            day TEXT NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, category, type)
+        )
+    ''')
+    
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_day_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO totals_by_day (day, category, type, total, count)
+            VALUES (NEW.date, NEW.category, NEW.type, NEW.amount, 1)
+            ON CONFLICT (day, category, type) DO UPDATE SET
+                total = total + excluded.total, count = count + 1;
+        END
+    ''')
+    
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_day_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            UPDATE totals_by_day
+            SET total = total - OLD.amount, count = count - 1
+            WHERE day = OLD.date AND category = OLD.category AND type = OLD.type;
+        END
+    ''')
+    
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_day_update
+        AFTER UPDATE OF amount, category, type, date ON transactions
+        BEGIN
+            UPDATE totals_by_day
+            SET total = total - OLD.amount, count = count - 1
+            WHERE day = OLD.date AND category = OLD.category AND type = OLD.type;
+            
+            INSERT INTO totals_by_day (day, category, type, total, count)
+            VALUES (NEW.date, NEW.category, NEW.type, NEW.amount, 1)
+            ON CONFLICT (day, category, type) DO UPDATE SET
+                total = total + excluded.total, count = count + 1;
+        END
+    ''')
+    
+    # Backfill from the existing rows
+    conn.execute('''
+        INSERT OR REPLACE INTO totals_by_day (day, category, type, total, count)
+        SELECT date, category, type, SUM(amount), COUNT(*) FROM transactions
+        GROUP BY date, category, type
+    ''')
+
+
+def _transaction_search_index(conn):
+    """FTS5 index over transaction titles and descriptions"""
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+            title,
+            description,
+            content='transactions',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
+    
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (rowid, title, description)
+            VALUES (NEW.id, NEW.title, NEW.description);
+        END
+    ''')
+    
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, title, description)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description);
+        END
+    ''')
+    
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_update
+        AFTER UPDATE OF title, description ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, title, description)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description);
+            INSERT INTO transactions_fts (rowid, title, description)
+            VALUES (NEW.id, NEW.title, NEW.description);
+        END
+    ''')
+    
+    # Index the existing rows
+    conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+
+def _sql_to_cents(amount):
+    try:
+        return to_cents(amount)
+    except ValueError:  # text that is not a number, which CAST would make 0
+        return 0
+
+
+def _integer_cents(conn):
+    """Store money as integer cents: amount_cents, budget_cents, total_cents
+
+    SQLite cannot change a column's type in place, so both tables are
+    rebuilt (keeping ids and AUTOINCREMENT counters) and every index,
+    trigger and rollup that referenced the old REAL columns is recreated.
+    Amounts are converted by ``money.to_cents``, the rule new writes use.
+    """
+    conn.create_function("to_cents", 1, _sql_to_cents, deterministic=True)
+    sequences = dict(conn.execute(
+        "SELECT name, seq FROM sqlite_sequence WHERE name IN ('transactions', 'categories')"
+    ).fetchall())
+    
+    conn.execute('''
+        CREATE TABLE transactions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            amount_cents INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL CHECK (type IN ('income', 'expense')),
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO transactions_new
+            (id, title, amount_cents, category, type, date, time, description, created_at)
+        SELECT id, title, to_cents(amount), category, type,
+               date, time, description, created_at
+        FROM transactions
+    ''')
+    
+    conn.execute('''
+        CREATE TABLE categories_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            type TEXT NOT NULL CHECK (type IN ('income', 'expense')),
+            budget_cents INTEGER NOT NULL DEFAULT 0,
+            icon TEXT DEFAULT 'category',
+            color TEXT DEFAULT '#2196F3',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO categories_new (id, name, type, budget_cents, icon, color, created_at)
+        SELECT id, name, type, to_cents(COALESCE(budget, 0)),
+               icon, color, created_at
+        FROM categories
+    ''')
+    
+    # Dropping the old tables also drops their indexes and triggers
+    for table in ("transactions", "categories"):
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+        if table in sequences:
+            conn.execute(
+                "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?",
+                (sequences[table], table)
+            )
+    
+    conn.execute("CREATE INDEX idx_transactions_date_time ON transactions (date, time)")
+    conn.execute("CREATE INDEX idx_transactions_type_date_time ON transactions (type, date, time)")
+    conn.execute("CREATE INDEX idx_transactions_category_date_time ON transactions (category, date, time)")
+    conn.execute(
+        "CREATE INDEX idx_transactions_category_type_amount "
+        "ON transactions (category, type, amount_cents)"
+    )
+    
+    # Rollups: (table, [(key column, key expression over a transaction row)])
+    rollups = [
+        ("totals_by_type", [("type", "{row}.type")]),
+        ("totals_by_category", [("category", "{row}.category"), ("type", "{row}.type")]),
+        ("totals_by_month", [
+            ("month", "substr({row}.date, 1, 7)"), ("category", "{row}.category"), ("type", "{row}.type"),
+        ]),
+        ("totals_by_day", [("day", "{row}.date"), ("category", "{row}.category"), ("type", "{row}.type")]),
+    ]
+    add, subtract, backfill = [], [], []
+    for table, keys in rollups:
+        columns = ", ".join(column for column, _ in keys)
+        values = ", ".join(expr.format(row="NEW") for _, expr in keys)
+        match = " AND ".join(f"{column} = {expr.format(row='OLD')}" for column, expr in keys)
+        exprs = ", ".join(expr.format(row="transactions") for _, expr in keys)
+        
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f'''
+            CREATE TABLE {table} (
+                {", ".join(f"{column} TEXT NOT NULL" for column, _ in keys)},
+                total_cents INTEGER NOT NULL DEFAULT 0,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY ({columns})
+            )
+        ''')
+        add.append(f'''
+            INSERT INTO {table} ({columns}, total_cents, count)
+            VALUES ({values}, NEW.amount_cents, 1)
+            ON CONFLICT ({columns}) DO UPDATE SET
+                total_cents = total_cents + excluded.total_cents, count = count + 1;''')
+        subtract.append(f'''
+            UPDATE {table}
+            SET total_cents = total_cents - OLD.amount_cents, count = count - 1
+            WHERE {match};''')
+        backfill.append(
+            f"INSERT INTO {table} ({columns}, total_cents, count) "
+            f"SELECT {exprs}, SUM(amount_cents), COUNT(*) FROM transactions GROUP BY {exprs}"
+        )
+    
+    conn.execute(f'''
+        CREATE TRIGGER trg_transactions_rollup_insert
+        AFTER INSERT ON transactions
+        BEGIN{"".join(add)}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER trg_transactions_rollup_delete
+        AFTER DELETE ON transactions
+        BEGIN{"".join(subtract)}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER trg_transactions_rollup_update
+        AFTER UPDATE OF amount_cents, category, type, date ON transactions
+        BEGIN{"".join(subtract)}{"".join(add)}
+        END
+    ''')
+    for statement in backfill:
+        conn.execute(statement)
+    
+    for table in ("transactions", "categories"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f'''
+                CREATE TRIGGER trg_{table}_data_version_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE data_version SET version = version + 1 WHERE id = 1;
+                END
+            ''')
+    
+    # Ids, titles and descriptions are unchanged, so the FTS index stays valid
+    conn.execute('''
+        CREATE TRIGGER trg_transactions_fts_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (rowid, title, description)
+            VALUES (NEW.id, NEW.title, NEW.description);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER trg_transactions_fts_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, title, description)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER trg_transactions_fts_update
+        AFTER UPDATE OF title, description ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, title, description)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description);
+            INSERT INTO transactions_fts (rowid, title, description)
+            VALUES (NEW.id, NEW.title, NEW.description);
+        END
+    ''')
+    
+    conn.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+
+
+def _transaction_archives(conn):
+    """Manifest of per-year archive files and the totals they hold"""
+    conn.execute('''
+        CREATE TABLE archives (
+            year INTEGER PRIMARY KEY,
+            filename TEXT NOT NULL,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            min_id INTEGER,
+            max_id INTEGER,
+            first_date TEXT,
+            last_date TEXT,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Archived amounts stay in the rollups; this records how much of each
+    # rollup row lives in archive files so the rollups can be verified
+    conn.execute('''
+        CREATE TABLE archive_totals (
+            date TEXT NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL,
+            total_cents INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, category, type)
+        )
+    ''')
+
+
+def _change_log(conn):
+    """Sequenced log of row changes for delta sync"""
+    conn.execute('''
+        CREATE TABLE change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL CHECK (entity IN ('transaction', 'category')),
+            entity_id INTEGER NOT NULL,
+            op TEXT NOT NULL CHECK (op IN ('insert', 'update', 'delete')),
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Lowest sequence a client may sync from; raised when the log is pruned
+    conn.execute('''
+        CREATE TABLE sync_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            floor INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute("INSERT INTO sync_state (id, floor) VALUES (1, 0)")
+    
+    for table, entity in (("transactions", "transaction"), ("categories", "category")):
+        for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            conn.execute(f'''
+                CREATE TRIGGER trg_{table}_change_log_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO change_log (entity, entity_id, op)
+                    VALUES ('{entity}', {row}.id, '{event.lower()}');
+                END
+            ''')
+
+
+# (version, description, upgrade step) in application order. Never edit a
+# released step; append a new one instead.
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "transaction indexes", _transaction_indexes),
+    (3, "rollup tables", _rollup_tables),
+    (4, "data version counter", _data_version),
+    (5, "daily rollup", _daily_rollup),
+    (6, "transaction search index", _transaction_search_index),
+    (7, "integer cents", _integer_cents),
+    (8, "transaction archives", _transaction_archives),
+    (9, "change log", _change_log),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    """Return the schema version stored in the database header"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(pool):
+    """Apply every pending migration in one write transaction
+
+    Returns the ``(version, description)`` pairs that were applied. An
+    up-to-date database is detected from a plain read of the header, so a
+    normal boot never takes the write lock. Otherwise the version is checked
+    again under the writer's ``BEGIN IMMEDIATE`` lock, so concurrent callers
+    never apply the same step twice.
+    """
+    with closing(pool.connect(query_only=True)) as conn:
+        if schema_version(conn) >= SCHEMA_VERSION:
+            return []
+    
+    applied = []
+    with pool.writer() as conn:
+        current = schema_version(conn)
+        for version, description, step in MIGRATIONS:
+            if version <= current:
+                continue
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            applied.append((version, description))
+        
+        if applied:
+            conn.execute("ANALYZE")
+    return applied
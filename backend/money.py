@@ -0,0 +1,35 @@
+"""
+Money Representation
+Amounts are stored and summed as integer cents; the API speaks decimals
+"""
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+CENT = Decimal("0.01")
+MAX_CENTS = 2 ** 63 - 1  # SQLite INTEGER range
+
+
+def to_cents(amount):
+    """Integer cents for a decimal amount, rounded half away from zero
+
+    Floats go through their shortest repr, so 0.29 becomes 29 rather than
+    the 28.999... the binary value would truncate to.
+    """
+    try:
+        cents = int(Decimal(str(amount)).quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2))
+    except (InvalidOperation, ValueError):
+        raise ValueError("Amount must be a finite number")
+    if abs(cents) > MAX_CENTS:
+        raise ValueError("Amount is out of range")
+    return cents
+
+
+def from_cents(cents):
+    """Decimal amount for integer cents, as the number the API returns"""
+    return cents / 100
+
+
+def amount_column(column, alias, table=None):
+    """SELECT expression converting a cents column back to a decimal amount"""
+    source = f"{table}.{column}" if table else column
+    return f"{source} / 100.0 AS {alias}"
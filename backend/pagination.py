@@ -0,0 +1,113 @@
+"""
+Transaction Listing Helpers
+Shared column lists, filters and opaque keyset cursors for the list endpoints
+"""
+
+import base64
+import binascii
+import json
+from datetime import date
+
+from money import amount_column, to_cents
+
+# Newest first; id breaks ties so every row has a unique position
+ORDER_BY = "ORDER BY date DESC, time DESC, id DESC"
+
+# Largest page a list endpoint serves; deeper reads follow the cursor
+MAX_PAGE_SIZE = 1000
+
+
+def transaction_columns(table=None):
+    """SELECT list for a transaction as the API returns it, amount in decimal units"""
+    prefix = f"{table}." if table else ""
+    return ", ".join([
+        f"{prefix}id", f"{prefix}title", amount_column("amount_cents", "amount", table),
+        f"{prefix}category", f"{prefix}type", f"{prefix}date", f"{prefix}time",
+        f"{prefix}description", f"{prefix}created_at",
+    ])
+
+
+TRANSACTION_COLUMNS = transaction_columns()
+
+# Public columns of a category row, budget converted from stored cents
+CATEGORY_COLUMNS = f"id, name, type, {amount_column('budget_cents', 'budget')}, icon, color, created_at"
+
+
+def encode_cursor(*key):
+    """Encode the sort key of the last row on a page as an opaque token"""
+    raw = json.dumps(list(key), separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, shape=(str, str, int)):
+    """Decode a token from encode_cursor, raising ValueError if malformed
+
+    ``shape`` gives the expected type of each key component; the default is
+    the (date, time, id) key of ``ORDER_BY``.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not (isinstance(key, list) and len(key) == len(shape)
+            and all(isinstance(value, kind) for value, kind in zip(key, shape))):
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+
+def transaction_filters(type=None, category=None, date_from=None, date_to=None,
+                        min_amount=None, max_amount=None, cursor=None):
+    """Build the WHERE clauses and parameters for a transaction listing
+
+    ``cursor`` restricts the result to rows strictly after that position in
+    ``ORDER_BY``, so each page is an index range scan regardless of depth.
+    Amount bounds are decimal and compared exactly in cents. Dates are
+    normalized to YYYY-MM-DD (they are compared as strings); anything that
+    is not an ISO date raises ValueError.
+    """
+    if date_from:
+        date_from = date.fromisoformat(date_from).isoformat()
+    if date_to:
+        date_to = date.fromisoformat(date_to).isoformat()
+    
+    clauses = []
+    params = []
+    
+    if cursor:
+        key = decode_cursor(cursor)
+        # Bound the date too, so the index seek starts at the cursor row
+        # instead of scanning down to it from the top of the date range
+        if not date_to or key[0] < date_to:
+            date_to = key[0]
+    
+    if type:
+        clauses.append("type = ?")
+        params.append(type)
+    
+    if category:
+        clauses.append("category = ?")
+        params.append(category)
+    
+    if date_from:
+        clauses.append("date >= ?")
+        params.append(date_from)
+    
+    if date_to:
+        clauses.append("date <= ?")
+        params.append(date_to)
+    
+    if min_amount is not None:
+        clauses.append("amount_cents >= ?")
+        params.append(to_cents(min_amount))
+    
+    if max_amount is not None:
+        clauses.append("amount_cents <= ?")
+        params.append(to_cents(max_amount))
+    
+    if cursor:
+        clauses.append("(date, time, id) < (?, ?, ?)")
+        params.extend(key)
+    
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, params
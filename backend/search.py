@@ -0,0 +1,71 @@
+"""
+Transaction Search
+Full-text queries over the transactions_fts index
+"""
+
+import re
+
+from pagination import (
+    ORDER_BY, TRANSACTION_COLUMNS, decode_cursor, encode_cursor, transaction_columns,
+    transaction_filters,
+)
+
+SEARCH_ORDERS = ("rank", "date")
+
+# bm25 is lower-is-better; id breaks ties
+RANK_ORDER_BY = "ORDER BY rank, id"
+RANK_CURSOR_SHAPE = ((int, float), int)
+
+_TERM = re.compile(r'[^\s"]+\*?')
+
+
+def fts_query(text):
+    """Turn free text into a safe FTS5 MATCH expression
+
+    Every term is quoted so FTS5 operators in user input are treated as
+    literals; a trailing ``*`` on a term makes it a prefix query. Returns
+    None when the text contains no searchable terms.
+    """
+    terms = []
+    for term in _TERM.findall(text):
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    return " ".join(terms) or None
+
+
+def search_query(match, order="rank", cursor=None, limit=50, **filters):
+    """Build the SQL and parameters for one page of search results
+
+    ``filters`` are the keyword arguments of ``transaction_filters``. The
+    date order reuses the listing cursor; the rank order pages on
+    (bm25 rank, id).
+    """
+    if order == "date":
+        where, params = transaction_filters(cursor=cursor, **filters)
+        where += (" AND " if where else " WHERE ")
+        where += "id IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)"
+        params.append(match)
+        return f"SELECT {TRANSACTION_COLUMNS} FROM transactions{where} {ORDER_BY} LIMIT ?", params + [limit]
+    
+    where, params = transaction_filters(**filters)
+    where += (" AND " if where else " WHERE ") + "transactions_fts MATCH ?"
+    params.append(match)
+    if cursor:
+        rank, last_id = decode_cursor(cursor, RANK_CURSOR_SHAPE)
+        where += " AND (f.rank > ? OR (f.rank = ? AND t.id > ?))"
+        params += [rank, rank, last_id]
+    
+    query = (
+        f"SELECT {transaction_columns('t')}, f.rank AS rank FROM transactions_fts f "
+        f"JOIN transactions t ON t.id = f.rowid{where} {RANK_ORDER_BY} LIMIT ?"
+    )
+    return query, params + [limit]
+
+
+def next_cursor(order, row):
+    """Cursor that continues after ``row`` in the given order"""
+    if order == "date":
+        return encode_cursor(row["date"], row["time"], row["id"])
+    return encode_cursor(row["rank"], row["id"])
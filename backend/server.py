@@ -3,29 +3,363 @@ Backend Server Manager
 Handles starting/stopping the FastAPI server
 """
 
+import argparse
+import hashlib
+import http.client
+import importlib.metadata
+import importlib.util
 import subprocess
+import statistics
+import urllib.request
 import sys
 import os
 import time
 import signal
 import threading
+from collections import deque
 from pathlib import Path
 
+# Serving configuration (overridable through the environment)
+DEFAULT_HOST = os.environ.get("BUDGET_TRACKER_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.environ.get("BUDGET_TRACKER_PORT", "8000"))
+PRODUCTION = os.environ.get("BUDGET_TRACKER_MODE", "development") == "production"
+WORKERS = int(os.environ.get("BUDGET_TRACKER_WORKERS", "0")) or None
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.environ.get("BUDGET_TRACKER_GRACEFUL_TIMEOUT", "30"))
+FORCE_INSTALL = os.environ.get("BUDGET_TRACKER_FORCE_INSTALL", "0") == "1"
+
+# Readiness and restart supervision
+READY_TIMEOUT = float(os.environ.get("BUDGET_TRACKER_READY_TIMEOUT", "30"))
+PROBE_TIMEOUT = float(os.environ.get("BUDGET_TRACKER_PROBE_TIMEOUT", "2"))
+RESTART_BACKOFF_MAX = float(os.environ.get("BUDGET_TRACKER_RESTART_BACKOFF_MAX", "30"))
+MAX_RESTARTS = int(os.environ.get("BUDGET_TRACKER_MAX_RESTARTS", "10"))  # 0 = unlimited
+STABLE_UPTIME = 30.0  # a run this long resets the crash-loop backoff
+
+# Hung-backend watchdog (interval 0 disables it)
+WATCHDOG_INTERVAL = float(os.environ.get("BUDGET_TRACKER_WATCHDOG_INTERVAL", "5"))
+WATCHDOG_TIMEOUT = float(os.environ.get("BUDGET_TRACKER_WATCHDOG_TIMEOUT", "3"))
+WATCHDOG_FAILURES = int(os.environ.get("BUDGET_TRACKER_WATCHDOG_FAILURES", "3"))
+WATCHDOG_WINDOW = 120  # latency samples kept for percentiles
+
+# The backend runs in its own process group (a new session on POSIX,
+# CREATE_NEW_PROCESS_GROUP on Windows) so the launcher can signal and kill
+# every worker; main.py dumps all thread stacks on SIGUSR1
+STACK_DUMP_SIGNAL = getattr(signal, "SIGUSR1", None)
+
+# Fingerprint of the last successful dependency install
+DEPENDENCY_STAMP = Path(__file__).parent / ".requirements.stamp"
+
+def _has_module(name):
+    return importlib.util.find_spec(name) is not None
+
+def default_worker_count():
+    """One worker per CPU core"""
+    return max(1, os.cpu_count() or 1)
+
+def uvicorn_command(host, port, production=False, workers=None):
+    """Build the uvicorn command line for development or production serving
+
+    Development mode runs a single process with ``--reload``. Production
+    mode drops the file watcher and runs several workers on uvloop/httptools
+    when installed, draining in-flight requests for up to
+    GRACEFUL_SHUTDOWN_TIMEOUT seconds on SIGTERM.
+    """
+    command = [
+        sys.executable, "-m", "uvicorn",
+        "main:app",
+        "--host", host,
+        "--port", str(port),
+    ]
+    if not production:
+        return command + ["--reload"]
+    
+    command += [
+        "--workers", str(workers or default_worker_count()),
+        "--timeout-graceful-shutdown", str(GRACEFUL_SHUTDOWN_TIMEOUT),
+        "--no-access-log",
+    ]
+    if _has_module("uvloop"):
+        command += ["--loop", "uvloop"]
+    if _has_module("httptools"):
+        command += ["--http", "httptools"]
+    return command
+
+def requirements_fingerprint(requirements_file):
+    """Hash of the requirements file, the interpreter and every installed distribution"""
+    digest = hashlib.sha256(Path(requirements_file).read_bytes())
+    digest.update(f"{sys.executable}\n{sys.version}\n".encode())
+    installed = sorted(
+        f"{dist.metadata['Name']}=={dist.version}"
+        for dist in importlib.metadata.distributions()
+    )
+    digest.update("\n".join(installed).encode())
+    return digest.hexdigest()
+
+def ensure_dependencies(requirements_file, force=FORCE_INSTALL):
+    """Run pip only when the requirements or the environment changed
+
+    A successful install records the fingerprint in DEPENDENCY_STAMP; later
+    starts compare against it and skip pip entirely. Returns True when pip
+    ran. Raises ``subprocess.CalledProcessError`` if the install fails.
+    """
+    requirements_file = Path(requirements_file)
+    if not requirements_file.exists():
+        return False
+    if not force and DEPENDENCY_STAMP.exists():
+        if DEPENDENCY_STAMP.read_text().strip() == requirements_fingerprint(requirements_file):
+            return False
+    
+    subprocess.check_call([
+        sys.executable, "-m", "pip", "install", "-r", str(requirements_file)
+    ])
+    # Fingerprint after the install so the new environment is what matches
+    importlib.invalidate_caches()
+    DEPENDENCY_STAMP.write_text(requirements_fingerprint(requirements_file))
+    return True
+
+def server_environment(production=False, workers=None):
+    """Environment for the uvicorn process
+
+    Multiple workers share budget_tracker.db, so their writers coordinate
+    through the database layer's cross-process writer lock. The launch
+    timestamp lets the server report its time to first healthy response.
+    """
+    env = dict(os.environ)
+    env["BUDGET_TRACKER_LAUNCH_TS"] = repr(time.time())
+    if production and (workers or default_worker_count()) > 1:
+        env["BUDGET_DB_PROCESS_LOCK"] = "1"
+    return env
+
+# Probes never go through an HTTP proxy configured in the environment
+_opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+def health_url(host, port):
+    """URL of the /health endpoint, reachable even when bound to all interfaces"""
+    if host in ("", "0.0.0.0"):
+        host = "127.0.0.1"
+    elif host == "::":
+        host = "[::1]"
+    return f"http://{host}:{port}/health"
+
+def probe_health(url, timeout=PROBE_TIMEOUT):
+    """Return True if ``url`` answers 200 within ``timeout`` seconds"""
+    try:
+        with _opener.open(url, timeout=timeout) as response:
+            return response.status == 200
+    except (OSError, http.client.HTTPException):
+        return False
+
+def wait_until_ready(url, process=None, timeout=READY_TIMEOUT, initial_delay=0.05, max_delay=1.0):
+    """Poll /health with exponential backoff until it answers or the deadline passes
+
+    Returns True as soon as the server responds, and False once ``timeout``
+    seconds have passed or ``process`` has exited.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        if process is not None and process.poll() is not None:
+            return False
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        if probe_health(url, min(remaining, PROBE_TIMEOUT)):
+            return True
+        time.sleep(max(0.0, min(delay, deadline - time.monotonic())))
+        delay = min(delay * 2, max_delay)
+
+def spawn_backend(command, cwd, env):
+    """Start the uvicorn process in its own process group"""
+    if os.name == "posix":
+        return subprocess.Popen(command, cwd=cwd, env=env, start_new_session=True)
+    return subprocess.Popen(command, cwd=cwd, env=env, creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+
+def ignore_stack_dump_signal():
+    """Keep the launcher and uvicorn's supervisor alive when stack dumps are requested
+
+    The ignored disposition is inherited by the backend; only processes that
+    import main.py install a handler for it.
+    """
+    if STACK_DUMP_SIGNAL is not None:
+        signal.signal(STACK_DUMP_SIGNAL, signal.SIG_IGN)
+
+def dump_backend_stacks(process):
+    """Ask every backend process to write its thread stacks to stderr"""
+    if STACK_DUMP_SIGNAL is None:
+        print("⚠️  Stack dumps need SIGUSR1, which this platform does not have")
+        return False
+    try:
+        os.killpg(process.pid, STACK_DUMP_SIGNAL)
+    except OSError:
+        return False
+    return True
+
+def stop_backend(process):
+    """Ask the backend and its workers to shut down gracefully"""
+    if os.name == "posix":
+        # SIGTERM lets uvicorn stop accepting and drain in-flight requests
+        process.terminate()
+    else:
+        # uvicorn handles Ctrl+Break like SIGTERM; the event reaches the
+        # whole process group, workers included
+        process.send_signal(signal.CTRL_BREAK_EVENT)
+
+def kill_backend(process):
+    """Kill the backend and any workers it spawned"""
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+            return
+        # Killing only the launched supervisor would orphan the workers,
+        # which keep holding the port
+        result = subprocess.run(
+            ["taskkill", "/T", "/F", "/PID", str(process.pid)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        if result.returncode != 0 and process.poll() is None:
+            process.kill()
+    except OSError:
+        try:
+            process.kill()
+        except OSError:
+            pass
+
+def watch_exit(process, on_exit):
+    """Call ``on_exit(returncode)`` from a daemon thread as soon as ``process`` exits"""
+    thread = threading.Thread(
+        target=lambda: on_exit(process.wait()),
+        name=f"watch-{process.pid}",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+def wait_for(event):
+    """Block until ``event`` is set, staying responsive to Ctrl+C on every platform"""
+    while not event.wait(1.0):
+        pass
+
+class RestartBackoff:
+    """Exponential delay between restarts that resets once a run stays up"""
+    
+    def __init__(self, initial=0.5, maximum=RESTART_BACKOFF_MAX, stable_after=STABLE_UPTIME,
+                 max_failures=MAX_RESTARTS):
+        self.initial = initial
+        self.maximum = maximum
+        self.stable_after = stable_after
+        self.max_failures = max_failures
+        self.failures = 0
+    
+    def next_delay(self, uptime):
+        """Seconds to wait before restarting, or None once the crash loop should stop"""
+        if uptime >= self.stable_after:
+            self.failures = 0
+        self.failures += 1
+        if self.max_failures and self.failures > self.max_failures:
+            return None
+        return min(self.initial * 2 ** (self.failures - 1), self.maximum)
+
+class HealthWatchdog:
+    """Background /health prober that recovers a backend which is alive but wedged
+
+    Every ``interval`` seconds the watched process (``target()``, or None
+    while it is starting or stopped) is probed. Latencies feed rolling
+    percentiles. After ``max_failures`` consecutive timeouts or errors the
+    watchdog dumps every thread's stack through faulthandler, then kills the
+    backend so its supervisor restarts it.
+    """
+    
+    def __init__(self, url, target, interval=WATCHDOG_INTERVAL, timeout=WATCHDOG_TIMEOUT,
+                 max_failures=WATCHDOG_FAILURES, window=WATCHDOG_WINDOW):
+        self.url = url
+        self.target = target
+        self.interval = interval
+        self.timeout = timeout
+        self.max_failures = max(1, max_failures)
+        self.latencies = deque(maxlen=window)
+        self.failures = 0
+        self.trips = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Start probing in a daemon thread (no-op when the interval is 0)"""
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-watchdog", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop probing"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 1)
+            self._thread = None
+    
+    def percentiles(self):
+        """p50/p95/p99 /health latency in milliseconds over the recent window"""
+        with self._lock:
+            samples = list(self.latencies)
+        if len(samples) < 2:
+            value = samples[0] * 1000 if samples else 0.0
+            return {"p50": value, "p95": value, "p99": value}
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+        return {"p50": cuts[49] * 1000, "p95": cuts[94] * 1000, "p99": cuts[98] * 1000}
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            process = self.target()
+            if process is None or process.poll() is not None:
+                self.failures = 0
+                continue
+            
+            started = time.perf_counter()
+            healthy = probe_health(self.url, self.timeout)
+            if healthy:
+                with self._lock:
+                    self.latencies.append(time.perf_counter() - started)
+                self.failures = 0
+                continue
+            
+            self.failures += 1
+            print(f"⚠️  Backend health probe failed ({self.failures}/{self.max_failures})")
+            if self.failures >= self.max_failures and not self._stop.is_set():
+                self._trip(process)
+    
+    def _trip(self, process):
+        self.trips += 1
+        self.failures = 0
+        latency = self.percentiles()
+        print(f"❌ Backend unresponsive; /health latency p50={latency['p50']:.1f}ms "
+              f"p95={latency['p95']:.1f}ms p99={latency['p99']:.1f}ms. Dumping stacks and restarting")
+        if dump_backend_stacks(process):
+            time.sleep(1.0)  # give faulthandler time to write before the kill
+        kill_backend(process)
+
 class BackendServer:
-    def __init__(self, host="127.0.0.1", port=8000):
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, production=PRODUCTION, workers=WORKERS,
+                 force_install=FORCE_INSTALL):
         self.host = host
         self.port = port
+        self.production = production
+        self.workers = workers
+        self.force_install = force_install
         self.process = None
         self.backend_dir = Path(__file__).parent
+        self.started_at = 0.0
+        self.returncode = None
+        self.exited = threading.Event()
+        self.stopped = False
+        self.ready = False
+        self.watchdog = HealthWatchdog(health_url(host, port), self._watched_process)
         
     def install_dependencies(self):
-        """Install Python dependencies"""
-        requirements_file = self.backend_dir / "requirements.txt"
-        if requirements_file.exists():
-            print("Installing Python dependencies...")
-            subprocess.check_call([
-                sys.executable, "-m", "pip", "install", "-r", str(requirements_file)
-            ])
+        """Install Python dependencies unless they are already up to date"""
+        if ensure_dependencies(self.backend_dir / "requirements.txt", self.force_install):
+            print("Installed Python dependencies")
+        else:
+            print("Python dependencies up to date, skipping pip")
         
     def start_server(self):
         """Start the FastAPI server"""
@@ -38,41 +372,63 @@ class BackendServer:
             self.install_dependencies()
             
             # Start the server
-            print(f"Starting backend server on {self.host}:{self.port}")
-            
-            main_py = self.backend_dir / "main.py"
-            self.process = subprocess.Popen([
-                sys.executable, "-m", "uvicorn", 
-                "main:app",
-                "--host", self.host,
-                "--port", str(self.port),
-                "--reload"
-            ], cwd=str(self.backend_dir))
+            mode = "production" if self.production else "development"
+            print(f"Starting backend server on {self.host}:{self.port} ({mode} mode)")
             
-            # Wait a moment to check if server started successfully
-            time.sleep(2)
+            self.stopped = False
+            self.ready = False
+            self.exited.clear()
+            self.started_at = time.monotonic()
+            self.process = spawn_backend(
+                uvicorn_command(self.host, self.port, self.production, self.workers),
+                cwd=str(self.backend_dir),
+                env=server_environment(self.production, self.workers)
+            )
+            watch_exit(self.process, self._on_exit)
             
-            if self.process.poll() is None:
-                print(f"✅ Backend server started successfully!")
+            # Return as soon as /health answers instead of guessing a delay
+            if wait_until_ready(health_url(self.host, self.port), self.process):
+                self.ready = True
+                self.watchdog.start()
+                ready_in = time.monotonic() - self.started_at
+                print(f"✅ Backend server started successfully in {ready_in:.2f}s!")
                 print(f"🌐 API Documentation: http://{self.host}:{self.port}/docs")
                 return True
             else:
                 print("❌ Failed to start backend server")
+                self._terminate()
                 return False
                 
         except Exception as e:
             print(f"❌ Error starting server: {e}")
             return False
     
+    def _on_exit(self, returncode):
+        self.ready = False
+        self.returncode = returncode
+        self.exited.set()
+    
+    def _watched_process(self):
+        return self.process if self.ready else None
+    
+    def _terminate(self):
+        try:
+            stop_backend(self.process)
+        except OSError:  # already gone
+            pass
+        try:
+            self.process.wait(timeout=GRACEFUL_SHUTDOWN_TIMEOUT + 5 if self.production else 5)
+        except subprocess.TimeoutExpired:
+            kill_backend(self.process)
+    
     def stop_server(self):
         """Stop the FastAPI server"""
+        self.stopped = True
+        self.ready = False
+        self.watchdog.stop()
         if self.process:
             print("Stopping backend server...")
-            self.process.terminate()
-            try:
-                self.process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                self.process.kill()
+            self._terminate()
             self.process = None
             print("✅ Backend server stopped")
     
@@ -84,6 +440,30 @@ class BackendServer:
         """Restart the server"""
         self.stop_server()
         return self.start_server()
+    
+    def supervise(self):
+        """Block until the server is stopped, restarting it whenever it exits
+
+        Exits are picked up the moment they happen. Restarts back off
+        exponentially while the server keeps crashing soon after launch, and
+        supervision gives up after MAX_RESTARTS crashes in a row.
+        """
+        backoff = RestartBackoff()
+        while True:
+            wait_for(self.exited)
+            if self.stopped:
+                return True
+            
+            uptime = time.monotonic() - self.started_at
+            delay = backoff.next_delay(uptime)
+            if delay is None:
+                print(f"❌ Backend server crashed {backoff.failures - 1} times in a row, giving up")
+                return False
+            print(f"❌ Backend server exited with code {self.returncode} after {uptime:.1f}s, "
+                  f"restarting in {delay:.1f}s...")
+            time.sleep(delay)
+            if not self.start_server():
+                self.exited.set()
 
 def signal_handler(signum, frame):
     """Handle shutdown signals"""
@@ -93,19 +473,31 @@ def signal_handler(signum, frame):
     sys.exit(0)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Budget Tracker backend")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--production", action="store_true", default=PRODUCTION,
+                        help="multi-worker serving without the reloader")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="worker processes in production mode (default: CPU count)")
+    parser.add_argument("--reinstall", action="store_true", default=FORCE_INSTALL,
+                        help="run pip even if requirements.txt and the environment are unchanged")
+    args = parser.parse_args()
+    
     # Setup signal handlers
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
+    ignore_stack_dump_signal()
     
     # Create and start server
-    server = BackendServer()
+    server = BackendServer(args.host, args.port, args.production, args.workers, args.reinstall)
     signal_handler.server = server  # Store reference for signal handler
     
     if server.start_server():
         try:
-            # Keep the script running
-            while server.is_running():
-                time.sleep(1)
+            # Keep the script running, restarting the server if it dies
+            if not server.supervise():
+                sys.exit(1)
         except KeyboardInterrupt:
             server.stop_server()
     else:
@@ -0,0 +1,214 @@
+"""
+Per-User Database Shards
+Each user (or household) gets its own SQLite file, opened on demand and kept
+in a bounded LRU of open shards that share one database executor
+
+A shard bundles the connection pool, async facade, group-commit queue,
+forecast cache, change-feed notifier and (with NumPy installed) analytics
+column store for one file. Its schema is migrated the first time it is opened. Shards
+that nobody has used for a while, or that fall off the end of the LRU, are
+closed once their in-flight requests finish. The default database (no user
+selected) is pinned open.
+"""
+
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import analytics
+from database import MAX_WORKERS, AsyncDatabase, ConnectionPool, ExecutorStats
+from forecast import ForecastCache
+from migrations import migrate
+from sync import ChangeNotifier
+from write_queue import GroupCommitQueue
+
+# Shard configuration (overridable through the environment)
+SHARD_DIR = os.environ.get("BUDGET_SHARD_DIR", "data")
+MAX_OPEN_SHARDS = int(os.environ.get("BUDGET_SHARD_MAX_OPEN", "32"))
+SHARD_IDLE_SECONDS = float(os.environ.get("BUDGET_SHARD_IDLE_SECONDS", "300"))
+USER_HEADER = "X-Budget-User"
+
+_USER_ID = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+def normalize_user(user):
+    """Return the shard key for a user id, or raise ValueError
+
+    Ids are case-insensitive so they map to one file on every filesystem.
+    """
+    key = user.strip().lower()
+    if not _USER_ID.match(key):
+        raise ValueError(
+            f"Invalid {USER_HEADER}: use 1-64 letters, digits, '-' or '_'"
+        )
+    return key
+
+
+class Shard:
+    """Pool, async facade, write queue and caches for one user's database file"""
+
+    def __init__(self, key, path, executor, stats, observers):
+        self.key = key
+        self.path = path
+        self.executor = executor
+        self.pool = ConnectionPool(path)
+        for observer in observers:
+            self.pool.add_observer(observer)
+        self.db = AsyncDatabase(self.pool, executor=executor, stats=stats)
+        self.write_queue = GroupCommitQueue(self.db)
+        self.analytics = analytics.ColumnStore() if analytics.ENABLED else None
+        self.forecasts = ForecastCache()
+        self.changes = ChangeNotifier()
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+
+    async def close(self):
+        """Flush queued writes and close every connection"""
+        await self.write_queue.close()
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.db.close)
+
+
+class ShardManager:
+    """Bounded LRU of open shards keyed by user id
+
+    ``acquire(user)`` returns the user's shard with its in-flight count
+    raised; every acquire must be paired with ``release``. A user of None
+    selects the default database.
+    """
+
+    def __init__(self, default_path, shard_dir=SHARD_DIR, max_open=MAX_OPEN_SHARDS,
+                 idle_seconds=SHARD_IDLE_SECONDS, max_workers=MAX_WORKERS, observers=()):
+        self.default_path = default_path
+        self.shard_dir = shard_dir
+        self.max_open = max(1, max_open)
+        self.idle_seconds = idle_seconds
+        self.max_workers = max_workers
+        self.observers = [observer for observer in observers if observer is not None]
+        self.stats = ExecutorStats()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+        self.opened = 0
+        self.evicted = 0
+
+        self.default = Shard(None, default_path, self.executor, self.stats, self.observers)
+        self._shards = OrderedDict()
+        self._opening = {}
+        self._waiting = {}
+        self._sweeper = None
+
+    def path_for(self, key):
+        """Database file for a shard key"""
+        return os.path.join(self.shard_dir, f"{key}.db")
+
+    @property
+    def open_shards(self):
+        """Every open shard, default database first"""
+        return [self.default, *self._shards.values()]
+
+    async def acquire(self, user=None):
+        """Return the shard for ``user``, opening and migrating it on first use"""
+        if user is None:
+            shard = self.default
+        else:
+            key = normalize_user(user)
+            shard = self._shards.get(key)
+            if shard is None:
+                shard = await self._open(key)
+            self._shards.move_to_end(key)
+        shard.in_flight += 1
+        shard.last_used = time.monotonic()
+        return shard
+
+    def release(self, shard):
+        """Mark one request on ``shard`` as finished"""
+        shard.in_flight -= 1
+        shard.last_used = time.monotonic()
+
+    async def _open(self, key):
+        # Concurrent first requests for one user share a single open, and
+        # count as waiting so the new shard is not evicted before they run
+        opening = self._opening.get(key)
+        if opening is None:
+            opening = asyncio.ensure_future(self._create(key))
+            self._opening[key] = opening
+            opening.add_done_callback(lambda _: self._opening.pop(key, None))
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        try:
+            return await asyncio.shield(opening)
+        finally:
+            self._waiting[key] -= 1
+            if not self._waiting[key]:
+                del self._waiting[key]
+
+    async def _create(self, key):
+        shard = Shard(key, self.path_for(key), self.executor, self.stats, self.observers)
+        loop = asyncio.get_running_loop()
+        try:
+            os.makedirs(self.shard_dir, exist_ok=True)
+            await loop.run_in_executor(self.executor, migrate, shard.pool)
+        except BaseException:
+            await loop.run_in_executor(self.executor, shard.pool.close)
+            raise
+        self._shards[key] = shard
+        self.opened += 1
+        await self._evict_over_capacity()
+        return shard
+
+    def _busy(self, key, shard):
+        return shard.in_flight > 0 or key in self._waiting
+
+    async def _evict_over_capacity(self):
+        # Least recently used first; shards that are in use are kept
+        for key, shard in list(self._shards.items()):
+            if len(self._shards) <= self.max_open:
+                break
+            if not self._busy(key, shard):
+                await self._evict(key)
+
+    async def evict_idle(self):
+        """Close shards idle for longer than ``idle_seconds`` or beyond capacity"""
+        cutoff = time.monotonic() - self.idle_seconds
+        for key, shard in list(self._shards.items()):
+            if not self._busy(key, shard) and shard.last_used < cutoff:
+                await self._evict(key)
+        await self._evict_over_capacity()
+
+    async def _evict(self, key):
+        shard = self._shards.pop(key, None)
+        if shard is None:  # already evicted while we were closing another
+            return
+        self.evicted += 1
+        await shard.close()
+
+    async def _sweep(self):
+        interval = max(1.0, min(self.idle_seconds / 2, 60.0))
+        while True:
+            await asyncio.sleep(interval)
+            await self.evict_idle()
+
+    def start(self):
+        """Start the background idle-eviction task"""
+        if self._sweeper is None:
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep())
+
+    async def close(self):
+        """Stop eviction, close every shard and shut the executor down"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        for key in list(self._shards):
+            await self._evict(key)
+        await self.default.close()
+        self.executor.shutdown(wait=True)
+
+    def snapshot(self):
+        """Open-shard counters as a plain dict"""
+        return {
+            "open": len(self._shards),
+            "max_open": self.max_open,
+            "idle_seconds": self.idle_seconds,
+            "opened": self.opened,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,152 @@
+"""
+Slow Query Log
+Opt-in query observer that records statements over a time threshold along
+with their parameter shape and EXPLAIN QUERY PLAN output
+
+A statement's time is its execute plus every fetch from its cursor, so
+queries that do their work while rows are fetched are caught too. It is
+logged once, when the total first crosses the threshold; later fetches
+still add to its time in the summary.
+
+Enable with BUDGET_SLOW_QUERY_MS=<threshold>; entries go to the rotating
+file named by BUDGET_SLOW_QUERY_LOG (default slow_queries.log).
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+_EXPLAINABLE = {"SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH"}
+# With or without an index: walking a whole index in order still reads every row
+_FULL_SCAN = re.compile(r"^SCAN (\S+)(?: AS \S+)?(?: USING (?:COVERING )?INDEX \S+)?$")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Collapse whitespace so the same statement always groups together"""
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def parameter_shape(params):
+    """Describe bound parameters by type only, never by value"""
+    if params is None:
+        return "executemany"
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+def full_scans(plan):
+    """Tables the plan reads in full, directly or by walking a whole index"""
+    return [match.group(1) for match in map(_FULL_SCAN.match, plan) if match]
+
+
+class SlowQueryLog:
+    """Query observer capturing statements slower than ``threshold_ms``"""
+
+    def __init__(self, threshold_ms, log_path=None):
+        self.threshold = threshold_ms / 1000
+        self.threshold_ms = threshold_ms
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._summary = {}
+        self._logger = None
+        if log_path:
+            self._logger = logging.getLogger(f"budget_tracker.slow_queries.{id(self)}")
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+            handler = RotatingFileHandler(log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(handler)
+
+    def on_execute(self, cursor, sql, params, seconds):
+        cursor.slow_query_entry = None
+        self._observe(cursor, seconds)
+
+    def on_fetch(self, cursor, sql, rows, seconds):
+        self._observe(cursor, seconds)
+
+    def _observe(self, cursor, seconds):
+        entry = getattr(cursor, "slow_query_entry", None)
+        if entry is not None:
+            self._extend(entry, seconds)
+            return
+        if cursor.seconds < self.threshold:
+            return
+        plan = self._explain(cursor.connection, cursor.sql, cursor.params)
+        entry = cursor.slow_query_entry = {
+            "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+            "duration_ms": round(cursor.seconds * 1000, 3),
+            "sql": normalize_sql(cursor.sql),
+            "params": parameter_shape(cursor.params),
+            "plan": plan,
+            "full_scans": full_scans(plan),
+        }
+        self._record(entry)
+        if self._logger:
+            self._logger.info(json.dumps(entry))
+
+    def _explain(self, conn, sql, params):
+        words = sql.split(None, 1)
+        if params is None or not words or words[0].upper() not in _EXPLAINABLE:
+            return []
+        try:
+            # A plain cursor keeps the EXPLAIN itself out of the observers
+            rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        except sqlite3.Error as e:
+            return [f"EXPLAIN failed: {e}"]
+        return [row[3] for row in rows]
+
+    def _record(self, entry):
+        with self._lock:
+            stats = self._summary.get(entry["sql"])
+            if stats is None:
+                stats = self._summary[entry["sql"]] = {
+                    "sql": entry["sql"], "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                }
+            stats["count"] += 1
+            stats["total_ms"] += entry["duration_ms"]
+            stats["max_ms"] = max(stats["max_ms"], entry["duration_ms"])
+            stats["last_seen"] = entry["timestamp"]
+            stats["params"] = entry["params"]
+            stats["plan"] = entry["plan"]
+            stats["full_scans"] = entry["full_scans"]
+
+    def _extend(self, entry, seconds):
+        # Fetch time spent after the statement was logged
+        milliseconds = seconds * 1000
+        with self._lock:
+            entry["duration_ms"] = round(entry["duration_ms"] + milliseconds, 3)
+            stats = self._summary.get(entry["sql"])
+            if stats is not None:
+                stats["total_ms"] += milliseconds
+                stats["max_ms"] = max(stats["max_ms"], entry["duration_ms"])
+
+    def summary(self, limit=20):
+        """Slowest statements by total time spent above the threshold"""
+        with self._lock:
+            statements = [dict(stats) for stats in self._summary.values()]
+        statements.sort(key=lambda stats: stats["total_ms"], reverse=True)
+        for stats in statements:
+            stats["avg_ms"] = round(stats["total_ms"] / stats["count"], 3)
+            stats["total_ms"] = round(stats["total_ms"], 3)
+        return statements[:limit]
+
+
+def from_environment():
+    """Build a SlowQueryLog from BUDGET_SLOW_QUERY_MS, or None when disabled"""
+    threshold = os.environ.get("BUDGET_SLOW_QUERY_MS")
+    if not threshold:
+        return None
+    return SlowQueryLog(
+        float(threshold),
+        os.environ.get("BUDGET_SLOW_QUERY_LOG", "slow_queries.log"),
+    )
@@ -0,0 +1,208 @@
+"""
+Delta Sync
+Change feed over the change_log table so clients fetch only what changed
+
+Triggers append one entry per insert, update or delete of a transaction or
+category, numbered by a monotonically increasing ``seq``. A sync returns
+the current state of every row changed after the client's last sequence,
+or just its id when the row was deleted, with repeated changes to one row
+coalesced. A Server-Sent Events stream announces new sequence numbers.
+
+Archiving is not a change: the archive drops the deletes it logs, and rows
+that moved to an archive after they changed are read from it. Entries
+older than SYNC_RETENTION_DAYS are pruned by ``python sync.py prune``;
+clients that fall further behind have to refetch everything.
+
+Usage: python sync.py prune [database ...]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from archive import find_transaction
+from database import ConnectionPool
+from migrations import migrate
+from pagination import CATEGORY_COLUMNS, TRANSACTION_COLUMNS
+
+# Feed configuration (overridable through the environment)
+SYNC_PAGE_SIZE = int(os.environ.get("BUDGET_SYNC_PAGE_SIZE", "500"))
+SYNC_MAX_PAGE_SIZE = int(os.environ.get("BUDGET_SYNC_MAX_PAGE_SIZE", "5000"))
+SYNC_RETENTION_DAYS = int(os.environ.get("BUDGET_SYNC_RETENTION_DAYS", "90"))
+SYNC_POLL_SECONDS = float(os.environ.get("BUDGET_SYNC_POLL_SECONDS", "1.0"))
+SYNC_KEEPALIVE_SECONDS = float(os.environ.get("BUDGET_SYNC_KEEPALIVE_SECONDS", "15"))
+SYNC_STREAM_SECONDS = float(os.environ.get("BUDGET_SYNC_STREAM_SECONDS", "300"))
+SYNC_RETRY_MS = 2000
+
+BATCH = "id IN (SELECT value FROM json_each(?))"
+
+
+class SyncExpired(Exception):
+    """The requested sequence is not covered by the change log"""
+
+
+def current_seq(conn):
+    """Highest sequence ever assigned (entries may since have been removed)"""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return row[0] if row else 0
+
+
+def _rows(conn, table, columns, ids):
+    cursor = conn.execute(f"SELECT {columns} FROM {table} WHERE {BATCH} ORDER BY id", (json.dumps(ids),))
+    names = [column[0] for column in cursor.description]
+    return names, [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def changes_since(conn, since=None, limit=SYNC_PAGE_SIZE):
+    """One page of coalesced changes after ``since`` as a response dict
+
+    With ``since`` None only the current sequence is returned, for clients
+    starting from a full fetch. Raises SyncExpired when ``since`` predates
+    the pruned log or is ahead of it (a different or restored database).
+    """
+    current = current_seq(conn)
+    page = {
+        "since": since,
+        "next": current,
+        "has_more": False,
+        "transactions": [],
+        "categories": [],
+        "deleted": {"transactions": [], "categories": []},
+    }
+    if since is None:
+        return page
+
+    floor = conn.execute("SELECT floor FROM sync_state WHERE id = 1").fetchone()[0]
+    if since < floor or since > current:
+        raise SyncExpired(
+            f"Sequence {since} is outside the change log ({floor}..{current}); refetch everything"
+        )
+
+    # Latest change per row (SQLite takes the bare columns from the MAX row)
+    changes = conn.execute('''
+        SELECT entity, entity_id, op, MAX(seq) AS seq
+        FROM change_log
+        WHERE seq > ?
+        GROUP BY entity, entity_id
+        ORDER BY seq
+        LIMIT ?
+    ''', (since, limit + 1)).fetchall()
+    if len(changes) > limit:
+        changes = changes[:limit]
+        page["has_more"] = True
+        page["next"] = changes[-1][3]
+    elif changes:
+        page["next"] = max(current, changes[-1][3])
+
+    changed = {"transaction": [], "category": []}
+    deleted = {"transaction": [], "category": []}
+    for entity, entity_id, op, _ in changes:
+        (deleted if op == "delete" else changed)[entity].append(entity_id)
+
+    if changed["transaction"]:
+        names, page["transactions"] = _rows(conn, "transactions", TRANSACTION_COLUMNS, changed["transaction"])
+        found = {row["id"] for row in page["transactions"]}
+        for transaction_id in changed["transaction"]:
+            if transaction_id in found:
+                continue
+            row = find_transaction(conn, transaction_id)
+            if row:
+                page["transactions"].append(dict(zip(names, row)))
+            else:  # deleted after this page's changes were read
+                deleted["transaction"].append(transaction_id)
+    if changed["category"]:
+        _, page["categories"] = _rows(conn, "categories", CATEGORY_COLUMNS, changed["category"])
+        found = {row["id"] for row in page["categories"]}
+        deleted["category"] += [i for i in changed["category"] if i not in found]
+
+    page["deleted"] = {"transactions": deleted["transaction"], "categories": deleted["category"]}
+    return page
+
+
+class ChangeNotifier:
+    """Wakes change-feed streams of one shard as soon as this process writes
+
+    Writes made by other processes are picked up by polling instead.
+    """
+
+    def __init__(self):
+        self._event = None
+
+    def notify(self):
+        if self._event is not None:
+            self._event.set()
+            self._event = None
+
+    async def wait(self, timeout):
+        """Wait for the next local write or ``timeout`` seconds"""
+        if self._event is None:
+            self._event = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def event_stream(db, notifier, last_seq=None, duration=SYNC_STREAM_SECONDS):
+    """Server-Sent Events announcing the latest sequence whenever it moves
+
+    The stream ends after ``duration`` seconds; EventSource clients then
+    reconnect on their own after ``retry``.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    yield f"retry: {SYNC_RETRY_MS}\n\n"
+    last_sent = loop.time()
+    while loop.time() < deadline:
+        seq = await db.read(current_seq)
+        if seq != last_seq:
+            last_seq = seq
+            last_sent = loop.time()
+            yield f"id: {seq}\nevent: change\ndata: {json.dumps({'seq': seq})}\n\n"
+        elif loop.time() - last_sent >= SYNC_KEEPALIVE_SECONDS:
+            last_sent = loop.time()
+            yield ": keepalive\n\n"
+        await notifier.wait(min(SYNC_POLL_SECONDS, max(deadline - loop.time(), 0)))
+
+
+def prune_change_log(conn, retention_days=SYNC_RETENTION_DAYS):
+    """Delete entries older than the retention window and raise the sync floor"""
+    pruned_through = conn.execute(
+        "SELECT MAX(seq) FROM change_log WHERE changed_at < datetime('now', ?)",
+        (f"{-int(retention_days)} days",)
+    ).fetchone()[0]
+    if pruned_through is None:
+        return 0
+    deleted = conn.execute("DELETE FROM change_log WHERE seq <= ?", (pruned_through,)).rowcount
+    conn.execute("UPDATE sync_state SET floor = MAX(floor, ?) WHERE id = 1", (pruned_through,))
+    return deleted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the delta-sync change log")
+    parser.add_argument("command", choices=["prune"])
+    parser.add_argument(
+        "databases",
+        nargs="*",
+        metavar="database",
+        default=[os.environ.get("BUDGET_TRACKER_DB", "budget_tracker.db")],
+    )
+    parser.add_argument("--retention-days", type=int, default=SYNC_RETENTION_DAYS)
+    args = parser.parse_args(argv)
+
+    for database in args.databases:
+        pool = ConnectionPool(database)
+        try:
+            migrate(pool)
+            with pool.writer() as conn:
+                deleted = prune_change_log(conn, args.retention_days)
+        finally:
+            pool.close()
+        print(f"{database}: pruned {deleted} change log entries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Spending Trends
+Dense per-category time series read from the day and month rollups
+"""
+
+import calendar
+from datetime import date, timedelta
+
+from money import from_cents
+
+GRANULARITIES = ("day", "week", "month")
+
+# Default look-back when the caller gives no lower bound
+DEFAULT_PERIODS = {"day": 30, "week": 12, "month": 12}
+
+# Upper bound on the number of buckets in one response
+MAX_PERIODS = 1000
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _add_months(day, months):
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def bucket_start(granularity, day):
+    """First day of the bucket containing ``day``"""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return _month_start(day)
+    return day
+
+
+def bucket_label(granularity, start):
+    """Label used for a bucket in responses and SQL results"""
+    if granularity == "month":
+        return start.isoformat()[:7]
+    return start.isoformat()
+
+
+def next_bucket(granularity, start):
+    if granularity == "month":
+        return _add_months(start, 1)
+    if granularity == "week":
+        return start + timedelta(days=7)
+    return start + timedelta(days=1)
+
+
+def resolve_range(granularity, date_from=None, date_to=None, today=None):
+    """Parse and default the requested range, aligned to bucket boundaries
+
+    Raises ValueError for malformed dates, inverted ranges, ranges that
+    would produce more than MAX_PERIODS buckets or that reach past the
+    dates Python can represent.
+    """
+    try:
+        return _resolve_range(granularity, date_from, date_to, today)
+    except OverflowError:
+        raise ValueError("Date range is out of bounds")
+
+
+def _resolve_range(granularity, date_from, date_to, today):
+    end = date.fromisoformat(date_to) if date_to else (today or date.today())
+    if date_from:
+        start = date.fromisoformat(date_from)
+    elif granularity == "month":
+        start = _add_months(_month_start(end), 1 - DEFAULT_PERIODS["month"])
+    elif granularity == "week":
+        start = end - timedelta(weeks=DEFAULT_PERIODS["week"] - 1)
+    else:
+        start = end - timedelta(days=DEFAULT_PERIODS["day"] - 1)
+    
+    if start > end:
+        raise ValueError("'from' must not be after 'to'")
+    start = bucket_start(granularity, start)
+    
+    labels = []
+    bucket = bucket_start(granularity, start)
+    while bucket <= end:
+        labels.append(bucket_label(granularity, bucket))
+        if len(labels) > MAX_PERIODS:
+            raise ValueError(f"Range spans more than {MAX_PERIODS} {granularity} periods")
+        try:
+            bucket = next_bucket(granularity, bucket)
+        except (OverflowError, ValueError):  # no bucket after year 9999
+            break
+    return start, end, labels
+
+
+def trend_rows(conn, granularity, start, end, type, category=None):
+    """(period label, category, total cents) rows for the requested range
+
+    A month cut short by ``end`` is summed from the day rollup, so it
+    covers only the days up to ``end`` like the day and week series.
+    """
+    filters = " AND category = ?" if category else ""
+    extra = [category] if category else []
+    if granularity == "month":
+        partial = end.day != calendar.monthrange(end.year, end.month)[1]
+        rows = conn.execute(
+            "SELECT month, category, SUM(total_cents) FROM totals_by_month "
+            f"WHERE type = ? AND month >= ? AND month {'<' if partial else '<='} ?{filters} "
+            "GROUP BY month, category",
+            [type, bucket_label("month", start), bucket_label("month", end), *extra]
+        ).fetchall()
+        if partial:
+            rows += conn.execute(
+                "SELECT substr(day, 1, 7), category, SUM(total_cents) FROM totals_by_day "
+                f"WHERE type = ? AND day BETWEEN ? AND ?{filters} GROUP BY category",
+                [type, max(start, _month_start(end)).isoformat(), end.isoformat(), *extra]
+            ).fetchall()
+        return rows
+    
+    period = "day" if granularity == "day" else "date(day, '-6 days', 'weekday 1')"
+    return conn.execute(
+        f"SELECT {period} AS period, category, SUM(total_cents) FROM totals_by_day "
+        f"WHERE type = ? AND day BETWEEN ? AND ?{filters} GROUP BY period, category",
+        [type, start.isoformat(), end.isoformat(), *extra]
+    ).fetchall()
+
+
+def dense_series(labels, categories, rows):
+    """Expand sparse rollup rows into one zero-filled series per category
+
+    Totals are summed in integer cents and converted to decimal amounts last.
+    """
+    position = {label: i for i, label in enumerate(labels)}
+    series = {name: [0] * len(labels) for name in categories}
+    for label, name, total in rows:
+        if label not in position:
+            continue
+        series.setdefault(name, [0] * len(labels))[position[label]] = total
+    return [
+        {
+            "category": name,
+            "totals": [from_cents(cents) for cents in totals],
+            "total": from_cents(sum(totals)),
+        }
+        for name, totals in sorted(series.items())
+    ]
@@ -0,0 +1,155 @@
+"""
+Group-Commit Write Queue
+Coalesces concurrent single-row writes into one SQLite transaction so a
+burst of requests pays for one commit instead of one commit each
+
+Callers await ``submit(fn, *args)`` exactly like ``AsyncDatabase.write``.
+Each operation runs inside its own SAVEPOINT, so a failing operation is
+rolled back on its own and only its caller sees the error. Futures are
+resolved only after the shared COMMIT has returned, so an acknowledged
+write is exactly as durable as one committed on its own.
+"""
+
+import asyncio
+import os
+import threading
+
+# Batching window (overridable through the environment)
+MAX_BATCH = int(os.environ.get("BUDGET_WRITE_BATCH_MAX", "256"))
+MAX_DELAY_MS = float(os.environ.get("BUDGET_WRITE_BATCH_DELAY_MS", "2"))
+
+
+class WriteQueueStats:
+    """Batch size counters for the write queue"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.operations = 0
+        self.failed = 0
+        self.largest_batch = 0
+
+    def on_batch(self, size, failed):
+        with self._lock:
+            self.batches += 1
+            self.operations += size
+            self.failed += failed
+            if size > self.largest_batch:
+                self.largest_batch = size
+
+    def snapshot(self):
+        """Return the current counters as a plain dict"""
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "operations": self.operations,
+                "failed": self.failed,
+                "largest_batch": self.largest_batch,
+                "batch_size_avg": (self.operations / self.batches) if self.batches else 0.0,
+            }
+
+
+class GroupCommitQueue:
+    """Write-behind queue in front of an AsyncDatabase
+
+    A single consumer task takes the first pending operation, then keeps
+    collecting until ``max_batch`` operations are queued or ``max_delay_ms``
+    has passed, and applies the whole batch in one write transaction. While
+    a batch is committing, new submissions pile up for the next one, so
+    batches grow with load and stay at one operation when idle.
+    """
+
+    def __init__(self, db, max_batch=MAX_BATCH, max_delay_ms=MAX_DELAY_MS):
+        self.db = db
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max(0.0, max_delay_ms) / 1000
+        self.stats = WriteQueueStats()
+        self._queue = None
+        self._consumer = None
+
+    @property
+    def pending(self):
+        """Operations waiting for the next batch"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, fn, *args):
+        """Run ``fn(conn, *args)`` in the next group commit and return its result"""
+        if self._consumer is None or self._consumer.done():
+            self._queue = asyncio.Queue()
+            self._consumer = asyncio.get_running_loop().create_task(self._consume())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((fn, args, future))
+        return await future
+
+    async def close(self):
+        """Flush every queued operation and stop the consumer"""
+        if self._consumer is None:
+            return
+        await self._queue.join()
+        self._consumer.cancel()
+        try:
+            await self._consumer
+        except asyncio.CancelledError:
+            pass
+        self._consumer = None
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._commit(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit(self, batch):
+        try:
+            outcomes = await self.db.write(_apply_batch, [(fn, args) for fn, args, _ in batch])
+        except Exception as e:
+            # The shared COMMIT failed: nothing in the batch was written
+            self.stats.on_batch(len(batch), len(batch))
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        failed = 0
+        for (_, _, future), (ok, value) in zip(batch, outcomes):
+            failed += not ok
+            if future.done():  # caller went away; the write still stands
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+        self.stats.on_batch(len(batch), failed)
+
+
+def _apply_batch(conn, operations):
+    """Apply each operation under its own savepoint inside the writer's transaction"""
+    outcomes = []
+    for fn, args in operations:
+        conn.execute("SAVEPOINT group_commit_op")
+        try:
+            result = fn(conn, *args)
+        except Exception as e:
+            conn.execute("ROLLBACK TO group_commit_op")
+            conn.execute("RELEASE group_commit_op")
+            outcomes.append((False, e))
+        else:
+            conn.execute("RELEASE group_commit_op")
+            outcomes.append((True, result))
+    return outcomes
@@ -0,0 +1,13 @@
+"""
+Budget Tracker API Benchmarks
+Synthetic dataset generation, load driving and baseline comparison
+
+Usage:
+    python -m benchmarks generate --rows 100000 --db bench.db
+    python -m benchmarks run --db bench.db --concurrency 16 --output results.json
+    python -m benchmarks compare baseline.json results.json
+"""
+
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
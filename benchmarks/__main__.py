@@ -0,0 +1,88 @@
+"""
+Benchmark command line entry point
+"""
+
+import argparse
+import json
+import sys
+
+from benchmarks import datagen, report, runner
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Budget Tracker API benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    generate = commands.add_parser("generate", help="create a synthetic dataset")
+    generate.add_argument("--db", required=True, help="SQLite file to create or extend")
+    generate.add_argument("--rows", type=int, default=10000)
+    generate.add_argument("--years", type=int, default=3, help="history span to spread rows over")
+    generate.add_argument("--seed", type=int, default=42)
+    
+    run = commands.add_parser("run", help="benchmark every endpoint")
+    target = run.add_mutually_exclusive_group(required=True)
+    target.add_argument("--db", help="dataset to serve from a locally started uvicorn")
+    target.add_argument("--url", help="benchmark an already running server instead")
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--duration", type=float, default=10.0, help="measured seconds per endpoint")
+    run.add_argument("--warmup", type=float, default=1.0, help="unmeasured seconds per endpoint")
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("--scenario", action="append", dest="scenarios",
+                     help="endpoint to run (repeatable); default is all")
+    run.add_argument("--no-copy", action="store_true",
+                     help="serve the dataset in place instead of a scratch copy")
+    run.add_argument("--output", help="write the JSON report here (default: stdout)")
+    run.add_argument("--baseline", help="compare against this saved report")
+    run.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    
+    compare = commands.add_parser("compare", help="compare two saved reports")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=10.0)
+    
+    commands.add_parser("list", help="list the available endpoint scenarios")
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == "generate":
+        datagen.generate(args.db, args.rows, seed=args.seed, years=args.years)
+        return 0
+    
+    if args.command == "list":
+        for name in runner.SCENARIOS:
+            print(name)
+        return 0
+    
+    if args.command == "compare":
+        rows, regressions = report.compare(report.load(args.baseline), report.load(args.current), args.threshold)
+        report.print_comparison(rows, regressions)
+        return 1 if regressions else 0
+    
+    results = runner.run(
+        database_path=args.db,
+        url=args.url,
+        scenarios=args.scenarios,
+        concurrency=args.concurrency,
+        duration=args.duration,
+        warmup=args.warmup,
+        seed=args.seed,
+        copy=not args.no_copy,
+    )
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    
+    if args.baseline:
+        rows, regressions = report.compare(report.load(args.baseline), results, args.threshold)
+        report.print_comparison(rows, regressions, file=sys.stderr)  # stdout carries only the report
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
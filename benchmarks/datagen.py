@@ -0,0 +1,148 @@
+"""
+Synthetic Dataset Generator
+Builds a realistic transactions table on top of the backend's own schema
+"""
+
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks import BACKEND_DIR
+
+# Merchant names per default category, used for titles and search terms
+MERCHANTS = {
+    "Food & Dining": ["Starbucks", "Chipotle", "Whole Foods", "Trader Joe's", "Pizza Hut", "Local Diner"],
+    "Transportation": ["Shell", "Chevron", "Uber", "Lyft", "Metro Card", "Parking Garage"],
+    "Shopping": ["Amazon", "Target", "Walmart", "IKEA", "Best Buy", "Etsy"],
+    "Entertainment": ["Netflix", "Spotify", "AMC Theatres", "Steam", "Concert Tickets"],
+    "Health": ["CVS Pharmacy", "Walgreens", "Dental Clinic", "Gym Membership"],
+    "Education": ["Coursera", "Udemy", "Bookstore", "Tuition Payment"],
+    "Utilities": ["Electric Company", "Water Utility", "Internet Provider", "Mobile Plan"],
+    "Rent": ["Monthly Rent"],
+    "Salary": ["Payroll Deposit"],
+    "Freelance": ["Client Invoice", "Upwork Payout", "Consulting Fee"],
+    "Business": ["Shop Revenue", "Wholesale Order"],
+    "Investment": ["Dividend", "Interest Payment", "Brokerage Transfer"],
+}
+
+NOTES = ["", "", "", "paid with card", "split with friends", "monthly", "online order", "refund pending"]
+
+# Relative frequency of each expense category
+EXPENSE_WEIGHTS = {
+    "Food & Dining": 30, "Transportation": 18, "Shopping": 15, "Entertainment": 10,
+    "Health": 5, "Education": 3, "Utilities": 4, "Rent": 1,
+}
+
+INCOME_SHARE = 0.05
+CHUNK_SIZE = 50000
+
+
+def _load_backend():
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    from aggregates import rebuild_rollups
+    from database import ConnectionPool
+    from migrations import migrate
+    return ConnectionPool, migrate, rebuild_rollups
+
+
+def _amount(rng, category, budget):
+    if category == "Rent":
+        return round(budget or 1200.0, 2)
+    if category == "Salary":
+        return round(rng.uniform(2500, 6000), 2)
+    # Log-normal spend centred on a small fraction of the monthly budget
+    scale = max(budget, 50.0) / 20
+    return round(min(rng.lognormvariate(0, 0.8) * scale, budget * 2 or 5000.0), 2)
+
+
+def generate_rows(rng, count, categories, years=3, end=None):
+    """Yield ``count`` transaction tuples spread over the last ``years``
+
+    Amounts are integer cents, matching the transactions table.
+    """
+    end = end or date.today()
+    span_days = years * 365
+    expense = [c for c in categories if c[1] == "expense"]
+    income = [c for c in categories if c[1] == "income"]
+    expense_weights = [EXPENSE_WEIGHTS.get(c[0], 2) for c in expense]
+    
+    for _ in range(count):
+        if income and rng.random() < INCOME_SHARE:
+            name, kind, budget = rng.choice(income)
+        else:
+            name, kind, budget = rng.choices(expense, weights=expense_weights)[0]
+        
+        merchant = rng.choice(MERCHANTS.get(name, [name]))
+        day = end - timedelta(days=rng.randrange(span_days))
+        yield (
+            merchant,
+            round(_amount(rng, name, budget) * 100),
+            name,
+            kind,
+            day.isoformat(),
+            f"{rng.randrange(7, 23):02d}:{rng.randrange(60):02d}",
+            rng.choice(NOTES) or None,
+        )
+
+
+def generate(database_path, rows, seed=42, years=3):
+    """Create or extend a benchmark database with ``rows`` transactions
+
+    Rows are bulk-loaded in one transaction with the transaction triggers
+    dropped; the rollups, search index, change log and data version they
+    would have maintained row by row are then brought up to date at once.
+    """
+    ConnectionPool, migrate, rebuild_rollups = _load_backend()
+    pool = ConnectionPool(database_path)
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    try:
+        migrate(pool)
+        with pool.reader() as conn:
+            categories = conn.execute(
+                "SELECT name, type, budget_cents / 100.0 FROM categories"
+            ).fetchall()
+        
+        generated = generate_rows(rng, rows, categories, years)
+        with pool.writer() as conn:
+            # Recreated from their stored SQL before the transaction commits
+            triggers = conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'transactions'"
+            ).fetchall()
+            for name, _ in triggers:
+                conn.execute(f"DROP TRIGGER {name}")
+            first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM transactions").fetchone()[0]
+            
+            written = 0
+            while written < rows:
+                chunk = [row for _, row in zip(range(CHUNK_SIZE), generated)]
+                conn.executemany(
+                    "INSERT INTO transactions (title, amount_cents, category, type, date, time, description) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    chunk,
+                )
+                written += len(chunk)
+                print(f"  {written}/{rows} transactions", end="\r", flush=True)
+            
+            print(f"\n  rebuilding rollups and search index", flush=True)
+            rebuild_rollups(conn)
+            conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+            conn.execute(
+                "INSERT INTO change_log (entity, entity_id, op) "
+                "SELECT 'transaction', id, 'insert' FROM transactions WHERE id >= ? ORDER BY id",
+                (first_id,)
+            )
+            conn.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+            for _, sql in triggers:
+                conn.execute(sql)
+        
+        with pool.writer() as conn:
+            conn.execute("ANALYZE")
+    finally:
+        pool.close()
+    
+    elapsed = time.perf_counter() - started
+    print(f"Generated {rows} transactions in {elapsed:.1f}s -> {database_path}")
+    return elapsed
@@ -0,0 +1,60 @@
+"""
+Result Comparison
+Compares a benchmark report against a saved baseline
+"""
+
+import json
+
+# (metric path, True when larger is better)
+METRICS = [
+    (("throughput_rps",), True),
+    (("latency_ms", "p50"), False),
+    (("latency_ms", "p95"), False),
+    (("latency_ms", "p99"), False),
+]
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _metric(stats, path):
+    for key in path:
+        stats = stats[key]
+    return stats
+
+
+def compare(baseline, current, threshold=10.0):
+    """Return (rows, regressions) comparing ``current`` with ``baseline``
+
+    Each row is ``(endpoint, metric, baseline, current, change %)``. A change
+    worse than ``threshold`` percent in any metric counts as a regression.
+    """
+    rows = []
+    regressions = []
+    for endpoint, stats in current["endpoints"].items():
+        base = baseline["endpoints"].get(endpoint)
+        if base is None:
+            continue
+        for path, higher_is_better in METRICS:
+            old = _metric(base, path)
+            new = _metric(stats, path)
+            change = ((new - old) / old * 100) if old else 0.0
+            row = (endpoint, ".".join(path), old, new, change)
+            rows.append(row)
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append(row)
+    return rows, regressions
+
+
+def print_comparison(rows, regressions, file=None):
+    width = max((len(row[0]) for row in rows), default=10)
+    print(f"{'endpoint':<{width}}  {'metric':<16} {'baseline':>12} {'current':>12} {'change':>9}", file=file)
+    flagged = set(regressions)
+    for row in rows:
+        endpoint, metric, old, new, change = row
+        marker = "  REGRESSION" if row in flagged else ""
+        print(f"{endpoint:<{width}}  {metric:<16} {old:>12.2f} {new:>12.2f} {change:>+8.1f}%{marker}", file=file)
+    print(f"\n{len(regressions)} regression(s)", file=file)
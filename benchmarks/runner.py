@@ -0,0 +1,319 @@
+"""
+Load Driver
+Starts the API under uvicorn and measures every endpoint at a fixed concurrency
+"""
+
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import date, datetime, timedelta
+
+from benchmarks import BACKEND_DIR
+from benchmarks.datagen import MERCHANTS
+
+
+class LocalServer:
+    """A uvicorn process serving the backend against a given database"""
+
+    def __init__(self, database_path, port=None, extra_args=()):
+        self.database_path = database_path
+        self.port = port or _free_port()
+        self.extra_args = list(extra_args)
+        self.process = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout=60):
+        env = dict(os.environ, BUDGET_TRACKER_DB=str(self.database_path))
+        self.process = subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1",
+            "--port", str(self.port),
+            "--log-level", "warning",
+            *self.extra_args,
+        ], cwd=str(BACKEND_DIR), env=env, stdout=subprocess.DEVNULL)  # stdout may carry the report
+        
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("Benchmark server exited during startup")
+            try:
+                if _request(self.url, "GET", "/health")[0] == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.1)
+        self.stop()
+        raise RuntimeError("Benchmark server did not become healthy in time")
+
+    def stop(self):
+        if self.process:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _request(base_url, method, path, body=None, connection=None):
+    """Send one request and return (status, body bytes)"""
+    parsed = urllib.parse.urlsplit(base_url)
+    conn = connection or http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=60)
+    payload = None
+    headers = {}
+    if body is not None:
+        payload = json.dumps(body).encode()
+        headers["Content-Type"] = "application/json"
+    try:
+        conn.request(method, path, body=payload, headers=headers)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        if connection is None:
+            conn.close()
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class Context:
+    """Sample data discovered from the running server"""
+
+    def __init__(self, base_url):
+        status, body = _request(base_url, "GET", "/categories")
+        self.categories = [c["name"] for c in json.loads(body)] if status == 200 else []
+        status, body = _request(base_url, "GET", "/transactions?limit=1000")
+        rows = json.loads(body) if status == 200 else []
+        self.ids = [row["id"] for row in rows] or [1]
+        self.dates = sorted({row["date"] for row in rows}) or [date.today().isoformat()]
+        self.terms = sorted({name.split()[0].lower() for names in MERCHANTS.values() for name in names})
+        status, body = _request(base_url, "GET", "/sync")
+        self.sync_seq = json.loads(body)["next"] if status == 200 else 0
+        self.created_ids = []
+        self.created_lock = threading.Lock()
+
+
+def _new_transaction(rng, ctx):
+    return {
+        "title": rng.choice(ctx.terms).title() + " benchmark",
+        "amount": round(rng.uniform(1, 200), 2),
+        "category": rng.choice(ctx.categories) if ctx.categories else "Shopping",
+        "type": "expense",
+        "date": date.today().isoformat(),
+        "time": datetime.now().strftime("%H:%M"),
+        "description": None,
+    }
+
+
+def _recent_range(ctx, days):
+    end = date.fromisoformat(ctx.dates[-1])
+    return (end - timedelta(days=days)).isoformat(), end.isoformat()
+
+
+# name -> callable(rng, ctx) returning (method, path, body)
+SCENARIOS = {
+    "GET /health": lambda rng, ctx: ("GET", "/health", None),
+    "GET /transactions": lambda rng, ctx: ("GET", "/transactions?limit=100", None),
+    "GET /transactions?category": lambda rng, ctx: (
+        "GET", "/transactions?" + urllib.parse.urlencode(
+            {"category": rng.choice(ctx.categories or ["Shopping"]), "limit": 50}), None),
+    "GET /transactions?from&to": lambda rng, ctx: (
+        "GET", "/transactions?" + urllib.parse.urlencode(
+            dict(zip(("from", "to"), _recent_range(ctx, 30)), limit=100)), None),
+    "GET /transactions/{id}": lambda rng, ctx: ("GET", f"/transactions/{rng.choice(ctx.ids)}", None),
+    "GET /transactions/search": lambda rng, ctx: (
+        "GET", "/transactions/search?" + urllib.parse.urlencode({"q": rng.choice(ctx.terms), "limit": 50}), None),
+    "GET /transactions/export": lambda rng, ctx: (
+        "GET", "/transactions/export?" + urllib.parse.urlencode(
+            dict(zip(("from", "to"), _recent_range(ctx, 7)), format="ndjson")), None),
+    "GET /categories": lambda rng, ctx: ("GET", "/categories", None),
+    "GET /budget/summary": lambda rng, ctx: ("GET", "/budget/summary", None),
+    "GET /budget/categories": lambda rng, ctx: ("GET", "/budget/categories", None),
+    "GET /budget/trends": lambda rng, ctx: ("GET", "/budget/trends?granularity=month", None),
+    "GET /budget/aggregate": lambda rng, ctx: (
+        "GET", "/budget/aggregate?" + urllib.parse.urlencode(
+            {"group_by": "month", "category": rng.choice(ctx.categories or ["Shopping"])}), None),
+    # A fixed day is served from the projection cache after the first call;
+    # a different day each time recomputes every category
+    "GET /budget/forecast": lambda rng, ctx: (
+        "GET", f"/budget/forecast?as_of={ctx.dates[-1]}", None),
+    "GET /budget/forecast?as_of": lambda rng, ctx: (
+        "GET", f"/budget/forecast?as_of={rng.choice(ctx.dates)}", None),
+    "GET /sync?since": lambda rng, ctx: (
+        "GET", f"/sync?since={max(0, ctx.sync_seq - 500)}", None),
+    "GET /metrics": lambda rng, ctx: ("GET", "/metrics", None),
+    "POST /transactions": lambda rng, ctx: ("POST", "/transactions", _new_transaction(rng, ctx)),
+    "POST /transactions/batch": lambda rng, ctx: (
+        "POST", "/transactions/batch", [_new_transaction(rng, ctx) for _ in range(100)]),
+    "DELETE /transactions/{id}": lambda rng, ctx: ("DELETE", f"/transactions/{_pop_created(ctx)}", None),
+}
+
+EXPECTED_STATUS = {"DELETE /transactions/{id}": (200, 404)}
+
+
+def _pop_created(ctx):
+    with ctx.created_lock:
+        return ctx.created_ids.pop() if ctx.created_ids else 0
+
+
+def run_scenario(base_url, name, ctx, concurrency, duration, warmup, seed):
+    """Drive one scenario and return its summary statistics"""
+    build = SCENARIOS[name]
+    expected = EXPECTED_STATUS.get(name, (200,))
+    latencies = []
+    errors = [0]
+    bytes_read = [0]
+    lock = threading.Lock()
+    start_at = time.perf_counter() + warmup
+    stop_at = start_at + duration
+    
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        parsed = urllib.parse.urlsplit(base_url)
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=60)
+        local = []
+        local_errors = 0
+        local_bytes = 0
+        try:
+            while True:
+                method, path, body = build(rng, ctx)
+                sent = time.perf_counter()
+                if sent >= stop_at:
+                    break
+                try:
+                    status, payload = _request(base_url, method, path, body, connection=conn)
+                except (OSError, http.client.HTTPException):
+                    conn.close()
+                    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=60)
+                    status, payload = 0, b""
+                elapsed = time.perf_counter() - sent
+                if name == "POST /transactions" and status == 200:
+                    with ctx.created_lock:
+                        ctx.created_ids.append(json.loads(payload)["id"])
+                if sent < start_at:
+                    continue
+                local.append(elapsed)
+                local_bytes += len(payload)
+                if status not in expected:
+                    local_errors += 1
+        finally:
+            conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+            bytes_read[0] += local_bytes
+    
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors[0],
+        "throughput_rps": count / duration if duration else 0.0,
+        "bytes_per_request": bytes_read[0] / count if count else 0,
+        "latency_ms": {
+            "mean": (sum(latencies) / count * 1000) if count else 0.0,
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p95": percentile(latencies, 0.95) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "max": (latencies[-1] * 1000) if count else 0.0,
+        },
+    }
+
+
+def _row_count(database_path):
+    import sqlite3
+    conn = sqlite3.connect(database_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def run(database_path=None, url=None, scenarios=None, concurrency=8, duration=10.0,
+        warmup=1.0, seed=1, copy=True, server_args=()):
+    """Benchmark every selected scenario and return a JSON-serialisable report
+
+    Without ``url`` a uvicorn server is started against a scratch copy of
+    ``database_path`` (or the file itself when ``copy`` is false) so write
+    scenarios do not alter the dataset.
+    """
+    names = scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(unknown)}")
+    
+    server = None
+    scratch = None
+    rows = None
+    try:
+        if url is None:
+            if database_path is None:
+                raise ValueError("Either a database or a server URL is required")
+            rows = _row_count(database_path)
+            target = database_path
+            if copy:
+                scratch = tempfile.mkdtemp(prefix="budget-bench-")
+                target = os.path.join(scratch, os.path.basename(database_path))
+                shutil.copyfile(database_path, target)
+            server = LocalServer(target, extra_args=server_args)
+            server.start()
+            url = server.url
+        
+        ctx = Context(url)
+        results = {}
+        for name in names:
+            print(f"  {name} ...", end=" ", flush=True, file=sys.stderr)
+            results[name] = run_scenario(url, name, ctx, concurrency, duration, warmup, seed)
+            stats = results[name]
+            print(f"{stats['throughput_rps']:.0f} req/s, p50 {stats['latency_ms']['p50']:.2f} ms, "
+                  f"p99 {stats['latency_ms']['p99']:.2f} ms, {stats['errors']} errors", file=sys.stderr)
+    finally:
+        if server:
+            server.stop()
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+    
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "rows": rows,
+            "concurrency": concurrency,
+            "duration_s": duration,
+            "warmup_s": warmup,
+            "seed": seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "endpoints": results,
+    }
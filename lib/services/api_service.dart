@@ -164,6 +164,10 @@ class ApiService {
   final http.Client _client = http.Client();
   final Duration _timeout = const Duration(seconds: 10);
 
+  // Last ETag and body per GET endpoint, revalidated with If-None-Match
+  final Map<String, String> _etags = {};
+  final Map<String, String> _cachedBodies = {};
+
   // Helper method for making HTTP requests
   Future<http.Response> _makeRequest(
     String method,
@@ -182,7 +186,12 @@ class ApiService {
     try {
       switch (method.toUpperCase()) {
         case 'GET':
+          final etag = _etags[endpoint];
+          if (etag != null) {
+            defaultHeaders['If-None-Match'] = etag;
+          }
           response = await _client.get(url, headers: defaultHeaders).timeout(_timeout);
+          response = _applyEtagCache(endpoint, response);
           break;
         case 'POST':
           response = await _client.post(
@@ -211,6 +220,21 @@ class ApiService {
     }
   }
 
+  // Serve 304 Not Modified from the cached body and remember new ETags
+  http.Response _applyEtagCache(String endpoint, http.Response response) {
+    final cachedBody = _cachedBodies[endpoint];
+    if (response.statusCode == 304 && cachedBody != null) {
+      return http.Response(cachedBody, 200, headers: response.headers);
+    }
+
+    final etag = response.headers['etag'];
+    if (response.statusCode == 200 && etag != null) {
+      _etags[endpoint] = etag;
+      _cachedBodies[endpoint] = response.body;
+    }
+    return response;
+  }
+
   // Check if backend is running
   Future<bool> isBackendRunning() async {
     try {
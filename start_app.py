@@ -4,6 +4,7 @@ Budget Tracker Desktop App Launcher
 Starts both Python backend and Flutter frontend
 """
 
+import argparse
 import subprocess
 import sys
 import os
@@ -12,15 +13,34 @@ import threading
 import signal
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+from server import (
+    FORCE_INSTALL, GRACEFUL_SHUTDOWN_TIMEOUT, PRODUCTION, WORKERS, HealthWatchdog, RestartBackoff,
+    ensure_dependencies, health_url, ignore_stack_dump_signal, kill_backend, server_environment,
+    spawn_backend, uvicorn_command, wait_for, wait_until_ready, watch_exit,
+)
+
 class AppLauncher:
-    def __init__(self):
+    def __init__(self, production=PRODUCTION, workers=WORKERS, force_install=FORCE_INSTALL):
+        self.production = production
+        self.workers = workers
+        self.force_install = force_install
         self.backend_process = None
+        self.backend_started_at = 0.0
+        self.backend_returncode = None
+        self.backend_exited = threading.Event()
+        self.backend_ready = False
+        self.watchdog = HealthWatchdog(
+            health_url("127.0.0.1", 8000),
+            lambda: self.backend_process if self.backend_ready else None
+        )
         self.flutter_process = None
         self.running = True
         
         # Setup signal handlers for clean shutdown
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
+        ignore_stack_dump_signal()
     
     def signal_handler(self, signum, frame):
         """Handle shutdown signals"""
@@ -29,22 +49,18 @@ class AppLauncher:
         sys.exit(0)
     
     def install_python_dependencies(self):
-        """Install Python backend dependencies"""
-        backend_dir = Path(__file__).parent / "backend"
-        requirements_file = backend_dir / "requirements.txt"
+        """Install Python backend dependencies unless they are already up to date"""
+        requirements_file = Path(__file__).parent / "backend" / "requirements.txt"
         
-        if requirements_file.exists():
-            print("📦 Installing Python dependencies...")
-            try:
-                subprocess.check_call([
-                    sys.executable, "-m", "pip", "install", "-r", str(requirements_file)
-                ])
+        try:
+            if ensure_dependencies(requirements_file, self.force_install):
                 print("✅ Python dependencies installed")
-                return True
-            except subprocess.CalledProcessError as e:
-                print(f"❌ Failed to install Python dependencies: {e}")
-                return False
-        return True
+            else:
+                print("✅ Python dependencies up to date")
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"❌ Failed to install Python dependencies: {e}")
+            return False
     
     def install_flutter_dependencies(self):
         """Install Flutter dependencies"""
@@ -66,24 +82,29 @@ class AppLauncher:
             return False
         
         try:
-            print("🐍 Starting Python backend server...")
-            self.backend_process = subprocess.Popen([
-                sys.executable, "-m", "uvicorn", 
-                "main:app",
-                "--host", "127.0.0.1",
-                "--port", "8000",
-                "--reload"
-            ], cwd=str(backend_dir))
+            mode = "production" if self.production else "development"
+            print(f"🐍 Starting Python backend server ({mode} mode)...")
+            self.backend_ready = False
+            self.backend_exited.clear()
+            self.backend_started_at = time.monotonic()
+            self.backend_process = spawn_backend(
+                uvicorn_command("127.0.0.1", 8000, self.production, self.workers),
+                cwd=str(backend_dir),
+                env=server_environment(self.production, self.workers)
+            )
+            watch_exit(self.backend_process, self._on_backend_exit)
             
-            # Wait a moment to see if process starts successfully
-            time.sleep(2)
-            
-            if self.backend_process.poll() is None:
-                print("✅ Backend server started on http://127.0.0.1:8000")
+            # Return as soon as /health answers instead of guessing a delay
+            if wait_until_ready(health_url("127.0.0.1", 8000), self.backend_process):
+                self.backend_ready = True
+                self.watchdog.start()
+                ready_in = time.monotonic() - self.backend_started_at
+                print(f"✅ Backend server started on http://127.0.0.1:8000 in {ready_in:.2f}s")
                 print("📚 API Documentation: http://127.0.0.1:8000/docs")
                 return True
             else:
                 print("❌ Backend server failed to start")
+                self.stop_backend()
                 return False
                 
         except Exception as e:
@@ -112,17 +133,47 @@ class AppLauncher:
             print(f"❌ Error starting Flutter app: {e}")
             return False
     
+    def _on_backend_exit(self, returncode):
+        self.backend_ready = False
+        self.backend_returncode = returncode
+        self.backend_exited.set()
+    
+    def stop_backend(self):
+        """Terminate the backend, giving it time to drain in-flight requests"""
+        self.backend_process.terminate()
+        try:
+            self.backend_process.wait(timeout=GRACEFUL_SHUTDOWN_TIMEOUT + 5 if self.production else 5)
+        except subprocess.TimeoutExpired:
+            kill_backend(self.backend_process)
+    
+    def supervise_backend(self):
+        """Restart the backend the moment it exits, backing off while it crash-loops"""
+        backoff = RestartBackoff()
+        while self.running:
+            wait_for(self.backend_exited)
+            if not self.running:
+                break
+            
+            uptime = time.monotonic() - self.backend_started_at
+            delay = backoff.next_delay(uptime)
+            if delay is None:
+                print(f"❌ Backend crashed {backoff.failures - 1} times in a row, giving up")
+                break
+            print(f"❌ Backend process exited with code {self.backend_returncode}, "
+                  f"restarting in {delay:.1f}s...")
+            time.sleep(delay)
+            if self.running and not self.start_backend():
+                self.backend_exited.set()
+    
     def stop_all(self):
         """Stop all processes"""
         self.running = False
+        self.backend_ready = False
+        self.watchdog.stop()
         
         if self.backend_process:
             print("🛑 Stopping backend server...")
-            self.backend_process.terminate()
-            try:
-                self.backend_process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                self.backend_process.kill()
+            self.stop_backend()
         
         if self.flutter_process:
             print("🛑 Stopping Flutter app...")
@@ -148,13 +199,10 @@ class AppLauncher:
         
         print("\n🎯 Starting services...")
         
-        # Start backend
+        # Start backend (returns once it answers /health)
         if not self.start_backend():
             return False
         
-        # Wait a bit for backend to fully start
-        time.sleep(3)
-        
         # Start Flutter app
         if not self.start_flutter():
             self.stop_all()
@@ -163,16 +211,9 @@ class AppLauncher:
         print("\n✅ Budget Tracker is now running!")
         print("💡 Press Ctrl+C to stop the application")
         
-        # Keep the launcher running
+        # Keep the launcher running, restarting the backend if it dies
         try:
-            while self.running:
-                # Check if backend is still running
-                if self.backend_process and self.backend_process.poll() is not None:
-                    print("❌ Backend process died, restarting...")
-                    if not self.start_backend():
-                        break
-                
-                time.sleep(1)
+            self.supervise_backend()
         
         except KeyboardInterrupt:
             pass
@@ -181,6 +222,15 @@ class AppLauncher:
         return True
 
 if __name__ == "__main__":
-    launcher = AppLauncher()
+    parser = argparse.ArgumentParser(description="Start the Budget Tracker backend and desktop app")
+    parser.add_argument("--production", action="store_true", default=PRODUCTION,
+                        help="run the backend with multiple workers and no reloader")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="backend worker processes in production mode")
+    parser.add_argument("--reinstall", action="store_true", default=FORCE_INSTALL,
+                        help="run pip even if requirements.txt and the environment are unchanged")
+    args = parser.parse_args()
+    
+    launcher = AppLauncher(args.production, args.workers, args.reinstall)
     success = launcher.run()
     sys.exit(0 if success else 1)